@@ -86,7 +86,6 @@ def _run_foffset_estimation(data, N=64, strategy="two-way", loss="mse",
     if (not truth_only):
         freq_estimator.optimize_to_y(strategy, loss=loss,
                                      max_window_span=max_transient)
-        freq_estimator.process(strategy)
 
 
 def _run_drift_estimation(data, strategy, pkts=False, loss="max-error",
@@ -116,8 +115,6 @@ def _run_drift_estimation(data, strategy, pkts=False, loss="max-error",
                                          cache=cache,
                                          cache_id=cache_id,
                                          force=force)
-        freq_estimator.process(strategy)
-        freq_estimator.estimate_drift()
 
 
 def _run_window_optimizer(data, disable_list, T_ns, metric, en_fine, force,
@@ -258,20 +258,24 @@ class Datasets():
                 req = requests.post(addr,
                                     data=json.dumps(parameters),
                                     headers=headers,
-                                    cert=cert)
+                                    cert=cert,
+                                    timeout=60.0)
                 req.raise_for_status()
                 response = req.json()
                 ds_found = response['found']
             except requests.exceptions.RequestException as e:
-                if (req.status_code == 400):
+                status_code = e.response.status_code if e.response is not None \
+                              else None
+                if (status_code == 400):
                     logger.info("Bad request! Check your cfg file.")
-                elif (req.status_code == 404):
+                elif (status_code == 404):
                     logger.info("No dataset found!")
                 else:
                     logger.info(e)
-                pass
+                continue
 
+            # The first server that answers the query is enough
+            break
 
         return ds_found
 
-
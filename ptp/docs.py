@@ -1,6 +1,6 @@
 """Generate documentation for testbed dataset
 """
-import logging, os, json, glob
+import logging, os, json, glob, contextlib
 from ptp.timestamping import Timestamp
 from datetime import timedelta
 import json2html
@@ -19,6 +19,9 @@ def sizeof_fmt(num, suffix='B'):
 
 class Docs():
     def __init__(self, reset=False, cfg_path='data/'):
+        # Whether saving the catalog files is deferred (see bulk())
+        self._defer_save = False
+
         if (cfg_path[0] == "/"):
             # Assume the target path is an absolute path
             self.cfg_path = os.path.abspath(cfg_path)
@@ -92,8 +95,8 @@ class Docs():
 
         return metadata
 
-    def add_dataset(self, file_path):
-        """Add dataset metadata into dataset catalog
+    def _catalog_dataset(self, file_path):
+        """Add or update the catalog entry of a dataset in memory
 
         Args:
             file_path : Path to dataset JSON file
@@ -118,6 +121,10 @@ class Docs():
             self.catalog.append({'dataset': ds_name,
                                  'info': metadata})
 
+        logger.info(f"{ds_name} cataloged")
+
+    def _save(self):
+        """Save the catalog on the JSON and HTML catalog files"""
         sorted_catalog = sorted(self.catalog,
                                 key=lambda k: k['dataset'],
                                 reverse=True)
@@ -125,7 +132,7 @@ class Docs():
         with open(self.catalog_json, 'w') as fd:
             json.dump(sorted_catalog, fd, sort_keys=True, indent=2)
 
-        logger.info(f"{ds_name} cataloged into {self.catalog_json}")
+        logger.info(f"Saved dataset catalog at {self.catalog_json}")
 
         # Re-generate .html catalog file
         json_data = json.dumps(sorted_catalog, sort_keys=True)
@@ -155,6 +162,58 @@ class Docs():
 
         logger.info(f"Updated HTML dataset catalog at {self.catalog_html}")
 
+    def add_dataset(self, file_path):
+        """Add dataset metadata into dataset catalog
+
+        Args:
+            file_path : Path to dataset JSON file
+
+        """
+        self._catalog_dataset(file_path)
+
+        if (not self._defer_save):
+            self._save()
+
+    @contextlib.contextmanager
+    def bulk(self):
+        """Defer saving the catalog files until the end of a block
+
+        Within the block, datasets added through add_dataset() are only
+        cataloged in memory. The catalog files are saved once when the block
+        completes successfully. For example:
+
+            with docs.bulk():
+                for file_path in file_paths:
+                    docs.add_dataset(file_path)
+
+        """
+        # Restore the previous state on exit so that nested blocks only save
+        # when the outermost block completes
+        prev_defer_save  = self._defer_save
+        self._defer_save = True
+        try:
+            yield self
+            self._defer_save = prev_defer_save
+            if (not self._defer_save):
+                self._save()
+        finally:
+            self._defer_save = prev_defer_save
+
+    def add_datasets(self, file_paths):
+        """Add the metadata of several datasets into the dataset catalog
+
+        Catalog all datasets first and save the catalog files only once in the
+        end, rather than once per dataset.
+
+        Args:
+            file_paths : List of paths to dataset files
+
+        """
+        with self.bulk():
+            for file_path in file_paths:
+                print(f"Processing {file_path}")
+                self.add_dataset(file_path)
+
     def process(self):
         """Read all datasets of target directory and generate catalog"""
 
@@ -168,10 +227,8 @@ class Docs():
         if (self.catalog_json in all_datasets):
             all_datasets.remove(self.catalog_json)
 
-        # Catalog each dataset
-        for dataset in sorted(all_datasets, reverse=True):
-            print(f"Processing {dataset}")
-            self.add_dataset(dataset)
+        # Catalog all datasets
+        self.add_datasets(sorted(all_datasets, reverse=True))
 
         print("Saved {}".format(self.catalog_json))
         print("Saved {}".format(self.catalog_html))
@@ -1,13 +1,324 @@
 """Estimators
 """
 import numpy as np
-import logging, os, json
+from scipy import signal
+import logging, os, json, math
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 import ptp.cache
 import ptp.filters
 
 
 logger = logging.getLogger(__name__)
 
+# Optimal configurations found by previous optimizer runs within this process,
+# indexed by the dataset fingerprint and the optimization parameters. Only the
+# most recently used _OPT_RESULTS_LEN entries are kept.
+_opt_results     = OrderedDict()
+_OPT_RESULTS_LEN = 64
+
+# Damping factors and loop bandwidths evaluated by the PI loop optimizer
+_DAMPING_VEC = np.array([0.5, 0.707, 1.0, 1.2, 1.5, 1.8, 2.0])
+_LOOPBW_VEC  = np.concatenate((
+    np.arange(0.1, 1.0, 0.1),
+    np.arange(0.01, 0.1, 0.01),
+    np.arange(0.001, 0.01, 0.001),
+    np.arange(0.0001, 0.001, 0.0001),
+    np.arange(0.00001, 0.0001, 0.00001)))
+
+# Default number of drift estimates accumulated in a window by the cumulative
+# drift error criterion (see _drift_err)
+_DRIFT_ERR_WIN = 8192
+
+# Timestamp differences that can be extracted as arrays (see _get_array)
+_TS_DIFFS = {
+    "t21" : ("t2", "t1"),
+    "t43" : ("t4", "t3")
+}
+
+# Differences between consecutive values that can be extracted as arrays (see
+# _get_array). Like "a[i] - a[i-1]" in Python indexing, entry 0 wraps around to
+# the last value, so callers should skip it whenever it is not meaningful.
+_STEP_DIFFS = {
+    "dt1" : "t1",
+    "dx"  : "x"
+}
+
+
+def _opt_lookup(key):
+    """Look up the result of a previous optimization
+
+    Args:
+        key : Dataset fingerprint and optimization parameters
+
+    Returns:
+        The optimal configuration, or None if not found.
+
+    """
+    if (key not in _opt_results):
+        return None
+    _opt_results.move_to_end(key)
+    return _opt_results[key]
+
+
+def _opt_store(key, result):
+    """Save the result of an optimization, evicting the least recently used
+
+    Args:
+        key    : Dataset fingerprint and optimization parameters
+        result : Optimal configuration
+
+    """
+    _opt_results[key] = result
+    _opt_results.move_to_end(key)
+    if (len(_opt_results) > _OPT_RESULTS_LEN):
+        _opt_results.popitem(last=False)
+
+
+def _col(data, key, default=None):
+    """Extract an array with the values of a given key over the dataset
+
+    Args:
+        data    : List of dictionaries containing the dataset
+        key     : Key of the target values
+        default : Value assumed on the dataset entries lacking the key. When
+                  set to None, all entries must contain the key.
+
+    Returns:
+        (np.ndarray) Array of float values.
+
+    """
+    if (default is None):
+        values = (float(r[key]) for r in data)
+    else:
+        values = (float(r.get(key, default)) for r in data)
+    return np.fromiter(values, dtype=np.float64, count=len(data))
+
+
+def _boxsum(a, N):
+    """Compute the running sum over a sliding window of N samples
+
+    Equivalent to the "valid" convolution of the input array with an all-ones
+    window of length N, but computed via cumulative sum differencing in O(L),
+    where L is the length of the input array.
+
+    Args:
+        a : Input array
+        N : Window length
+
+    Returns:
+        Array with the |L - N| + 1 window sums. Like the "valid" convolution,
+        when the input is shorter than the window (L < N), each of the N - L + 1
+        overlapping positions covers the entire input, so each sum is the total
+        sum of the input.
+
+    """
+    if (a.size < N):
+        return np.full(N - a.size + 1, a.sum())
+
+    cs    = np.empty(a.size + 1, dtype=a.dtype)
+    cs[0] = 0
+    np.cumsum(a, out=cs[1:])
+    return cs[N:] - cs[:-N]
+
+
+def _loss(err, loss):
+    """Compute the loss function over an array of errors
+
+    Compute the reductions without allocating intermediate arrays (such as the
+    squared or absolute errors).
+
+    Args:
+        err  : Array of errors
+        loss : Loss function (mse or max-error)
+
+    Returns:
+        Scalar value representing the MSE (mean square error) or max|error|
+        (maximum absolute error).
+
+    """
+    if (loss == "mse"):
+        return np.dot(err, err) / err.size
+    elif (loss == "max-error"):
+        return max(err.max(), -err.min())
+
+
+def _pi_loop(x_est, Kp, Ki):
+    """Run the PI loop recurrence over a sequence of time offset estimates
+
+    The loop is defined by the recurrence:
+
+        err[n]   = x_est[n] - dds[n]
+        f_int[n] = f_int[n-1] + Ki * err[n]
+        drift[n] = Kp * err[n] + f_int[n]
+        dds[n+1] = dds[n] + drift[n]
+
+    with dds[0] = x_est[0] and f_int[-1] = 0, where dds is the time offset
+    tracked by the loop (x_loop). This is a linear time-invariant system. With
+    respect to the offset input "x_est[n] - x_est[0]", which starts the loop
+    from rest, the loop error follows from the IIR filter:
+
+        E(z)/X(z) = (1 - z^-1)^2 / A(z),
+        A(z)      = 1 + (Kp + Ki - 2) z^-1 + (1 - Kp) z^-2,
+
+    which is run in C through scipy.signal.lfilter instead of iterating in
+    Python. The drifts and tracked time offsets then follow from the loop
+    error as in the recurrence, without further filtering.
+
+    NOTE: for small loop bandwidths, A(z) has two poles very close to z=1. In
+    this case, the rounding errors of a second-order direct-form filter are
+    amplified enough to bias the drift estimates, increasingly so with the
+    dataset length. Hence, the filter is run as a cascade of two first-order
+    sections, one per (possibly complex) pole, which preserves the precision
+    of the recurrence. The input is the second difference of x_est, which
+    stays small even when x_est ramps up to large values.
+
+    Args:
+        x_est : Array of time offset estimates
+        Kp    : Proportional gain
+        Ki    : Integral gain
+
+    Returns:
+        Tuple with the arrays of time offset drift estimates and of the time
+        offsets tracked by the loop, both with the same length as x_est.
+
+    """
+    # Poles of the loop: roots of "z^2 + (Kp + Ki - 2) z + (1 - Kp)", with the
+    # discriminant written in a form that avoids cancellation
+    K_sum = Kp + Ki
+    r     = np.sqrt(complex((K_sum * K_sum) - (4.0 * Ki))) / 2.0
+    p1    = 1.0 - (K_sum / 2.0) + r
+    p2    = 1.0 - (K_sum / 2.0) - r
+
+    # Loop error
+    x_dd = np.diff(x_est, n=2, prepend=[x_est[0], x_est[0]])
+    err  = signal.lfilter([1.0], [1.0, -p1], x_dd.astype(complex))
+    err  = signal.lfilter([1.0], [1.0, -p2], err).real
+
+    drift   = np.cumsum(Ki * err)
+    drift  += Kp * err
+    x_loop  = x_est - err
+    return drift, x_loop
+
+
+def _loop_constants(damping, loopbw):
+    """Compute the proportional and integral gains of the PI loop
+
+    Refer to "Rice, Michael. Digital Communications: A Discrete-Time
+    Approach. Appendix C."
+
+    Args:
+        damping : Damping factor
+        loopbw  : Loop bandwidth
+
+    Returns:
+        Tuple with the proportional (Kp) and integral (Ki) gains.
+
+    """
+    theta_n  = loopbw / (damping + (1.0/(4 * damping)))
+    denomin  = (1 + 2*damping*theta_n + (theta_n**2))
+    Kp_K0_K1 = (4 * damping * theta_n) / denomin
+    Kp_K0_K2 = (4 * (theta_n**2)) / denomin
+    # And since Kp and K0 are assumed unitary
+    Kp       = Kp_K0_K1 # proportional gain
+    Ki       = Kp_K0_K2 # integrator gain
+    return Kp, Ki
+
+
+def _drift_err(drift_est, true_drift, loss, criterion, n_samples, N,
+               cumulative):
+    """Compute the drift estimation error (see Estimator._eval_drift_err)
+
+    Args:
+        drift_est  : Array of drift estimates
+        true_drift : Array of true drifts corresponding to drift_est
+        loss       : Loss function (mse or max-error)
+        criterion  : Error criterion (cumulative or instantaneous)
+        n_samples  : Number of drift samples to consider (0 for all samples)
+        N          : Number of drift estimates to accumulate in a window
+        cumulative : Whether to use a cumulative sum instead of window sums
+                     under the cumulative criterion
+
+    Returns:
+        Scalar value representing the MSE or max|error| of the drift
+        estimates.
+
+    """
+    if (criterion == 'instantaneous'):
+        drift_err  = drift_est[-n_samples:] - true_drift[-n_samples:]
+        return _loss(drift_err, loss)
+
+    # Running-sum of drifts over a rolling window of N samples. If there is
+    # less than N samples in the dataset, use a cumulative sum.
+    if (cumulative):
+        true_cum_drift = true_drift.cumsum()
+        cum_drift_est  = drift_est.cumsum()
+    else:
+        # When only the last n_samples window sums are evaluated, skip the
+        # drifts that do not contribute to any of them
+        if (n_samples > 0 and n_samples + N - 1 < len(true_drift)):
+            true_drift = true_drift[-(n_samples + N - 1):]
+            drift_est  = drift_est[-(n_samples + N - 1):]
+        true_cum_drift = _boxsum(true_drift, N)
+        cum_drift_est  = _boxsum(drift_est, N)
+
+    # Normalized cumulative drift estimation errors
+    #
+    # Normalize by the absolute of the true drifts such that different
+    # frequency offsets (with varying levels of drifts) are equally
+    # weighted. For example, with 128 sample per second, a 10 ppb offset leads
+    # to drifts in the order of 10 ns when accumulated over N=128, whereas a
+    # 100 ppb freq. offset yields cumulative drifts in the order of 100 ns. If
+    # we estimate cumulative drifts of 9 ns and 90 ns, respectively, the
+    # absolute errors are 1 ns and 10 ns, respectively, which are unfair to
+    # compare (e.g., the max-error loss will focus on high frequency
+    # offsets). In contrast, the normalized errors are 0.1 in both cases,
+    # which can be compared fairly.
+    #
+    # To avoid Inf values, return zero for the normalized error everywhere the
+    # true cumulative drift (the normalization factor) presents zero
+    # values. Sometimes the cumulative error window has a net cumulative drift
+    # of zero nanoseconds, which leads to this scenario.
+    cum_drift_err      = (cum_drift_est - true_cum_drift)[-n_samples:]
+    norm_factor        = np.abs(true_cum_drift[-n_samples:])
+    norm_cum_drift_err = np.divide(cum_drift_err, norm_factor,
+                                   out = np.zeros_like(cum_drift_err),
+                                   where = (norm_factor != 0))
+    return _loss(norm_cum_drift_err, loss)
+
+
+def _eval_loop_row(x_est, true_drift, damping, loopbw_vec, i_settling, loss,
+                   criterion, N=_DRIFT_ERR_WIN):
+    """Evaluate the drift estimation error of the PI loop for a damping factor
+
+    Runs in a worker process of the loop optimizer. Hence, it only takes the
+    arrays that are needed for the evaluation rather than the dataset.
+
+    Args:
+        x_est      : Array of time offset estimates
+        true_drift : Array of true time offset drifts past the settling index
+        damping    : Damping factor
+        loopbw_vec : Loop bandwidths to evaluate
+        i_settling : Index after which the loop is assumed to be settled
+        loss       : Loss function (mse or max-error)
+        criterion  : Error criterion (cumulative or instantaneous)
+        N          : Number of drift estimates to accumulate in a window
+
+    Returns:
+        (np.ndarray) Drift estimation error obtained with each loop bandwidth.
+
+    """
+    errors = np.empty(len(loopbw_vec))
+
+    for j, loopbw in enumerate(loopbw_vec):
+        Kp, Ki    = _loop_constants(damping, loopbw)
+        drift, _  = _pi_loop(x_est, Kp, Ki)
+        errors[j] = _drift_err(drift[i_settling:], true_drift, loss,
+                               criterion, n_samples=0, N=N,
+                               cumulative=(len(x_est) <= N))
+
+    return errors
+
 
 class Estimator():
     """Frequency offset estimator"""
@@ -39,6 +350,190 @@ class Estimator():
         self.pkts   = pkts
         self.N_pkts = 128
 
+        # Arrays of dataset values (see _get_array)
+        self._arrays     = {}
+        self._arrays_src = None
+
+        # Arrays of estimates spanning the entire dataset, with NaN on the
+        # entries lacking an estimate (see _get_est and _set_est)
+        self._est = {}
+
+        # Index of the first entry of each array in self._est holding an
+        # estimate, when the estimates span a contiguous tail of the dataset
+        self._est_start = {}
+
+        # Scratch buffers for the windowed differences (see _delta)
+        self._scratch_diff = {}
+
+    def _delta(self, key, delta, slot):
+        """Compute the differences between values spaced by a given interval
+
+        The differences are written into a scratch buffer that is reused on
+        every call with the same slot, so that repeated calls (e.g., within
+        the window optimizers) do not allocate new arrays. The returned array
+        is only valid until the next call using the same slot.
+
+        Args:
+            key   : Key of the dataset values (see _get_array)
+            delta : Interval in samples between the differentiated values
+            slot  : Name of the scratch buffer to write into
+
+        Returns:
+            (np.ndarray) View of the scratch buffer holding a[delta:] -
+            a[:-delta], where a is the array of values of the given key.
+
+        """
+        a = self._get_array(key)
+        n = len(a)
+        if (slot not in self._scratch_diff or
+                len(self._scratch_diff[slot]) != n):
+            self._scratch_diff[slot] = np.empty(n)
+        return np.subtract(a[delta:], a[:-delta],
+                           out=self._scratch_diff[slot][:n - delta])
+
+    def _check_data(self):
+        """Drop the arrays derived from a dataset that was since replaced
+
+        If self.data is replaced by another dataset, the arrays of values and
+        of estimates held internally no longer correspond to it. Discard them,
+        so that the values are extracted again from the new dataset.
+
+        """
+        if (self._arrays_src is not self.data):
+            self._arrays       = {}
+            self._est          = {}
+            self._est_start    = {}
+            self._scratch_diff = {}
+            self._arrays_src   = self.data
+
+    def _get_array(self, key):
+        """Get the array of values of a given key over the dataset
+
+        The timestamps and time offset values do not change over the lifetime
+        of the estimator. Hence, extract each array only once from the dataset
+        and reuse it on subsequent calls. The arrays are only extracted again
+        if self.data is replaced by another dataset (see _check_data).
+
+        Args:
+            key : Key of the dataset entries (e.g., t1, x or x_est), one of
+                  the timestamp differences "t21" or "t43", or one of the
+                  differences between consecutive values "dt1" or "dx".
+
+        Returns:
+            (np.ndarray) Array with the values of the given key.
+
+        """
+        self._check_data()
+
+        if (key not in self._arrays):
+            if (key in _TS_DIFFS):
+                k_end, k_start = _TS_DIFFS[key]
+                self._arrays[key] = np.fromiter(
+                    (float(r[k_end] - r[k_start]) for r in self.data),
+                    dtype=np.float64, count=len(self.data))
+            elif (key in _STEP_DIFFS):
+                a = self._get_array(_STEP_DIFFS[key])
+                self._arrays[key] = a - np.roll(a, 1)
+            else:
+                self._arrays[key] = _col(self.data, key)
+
+        return self._arrays[key]
+
+    def _get_est(self, key):
+        """Get the array of estimates of a given key over the dataset
+
+        Args:
+            key : Estimate key (e.g., y_est or drift)
+
+        Returns:
+            (np.ndarray) Array with the estimates, containing NaN on the
+            dataset entries lacking an estimate. If the estimates were not
+            computed by this estimator, they are read from the dataset.
+
+        NOTE: the estimates held internally take precedence over the dataset.
+        Hence, if the estimates computed by this estimator are edited directly
+        in the dicts of self.data (e.g., the "y_est" or "drift" values), the
+        edits are not seen by this method. Replace self.data to discard the
+        estimates held internally.
+
+        """
+        self._check_data()
+        if (key not in self._est):
+            return _col(self.data, key, default=np.nan)
+        return self._est[key]
+
+    def _set_est(self, key, values):
+        """Set the estimates of a given key over the last dataset entries
+
+        Args:
+            key    : Estimate key (e.g., y_est or drift)
+            values : Array of estimates corresponding to the last entries of
+                     the dataset. The preceding entries are left without an
+                     estimate (NaN).
+
+        """
+        self._check_data()
+        est = np.full(len(self.data), np.nan)
+        est[len(self.data) - len(values):] = values
+        self._est[key]       = est
+        self._est_start[key] = len(self.data) - len(values)
+
+    def sync_back(self, *keys):
+        """Save the estimates held internally on the dataset
+
+        The estimates are computed and held internally as arrays. Mirror them
+        into the dicts of self.data, removing the key from the entries lacking
+        an estimate. The public methods that compute estimates already call
+        this method for the estimates they produce.
+
+        Args:
+            keys : Estimate keys to save. When empty, save all estimates.
+
+        """
+        self._check_data()
+        for key in (keys or self._est.keys()):
+            for r, v in zip(self.data, self._est[key].tolist()):
+                if (math.isnan(v)):
+                    r.pop(key, None)
+                else:
+                    r[key] = v
+
+    def _fingerprint(self, *keys, extra=None):
+        """Compute a fingerprint of the dataset values used by an optimizer
+
+        Args:
+            keys  : Keys of the dataset values (see _get_array) to consider.
+            extra : Additional array to include on the fingerprint.
+
+        Returns:
+            (int) Hash value identifying the dataset values.
+
+        """
+        arrays = [self._get_array(k) for k in keys]
+        if (extra is not None):
+            arrays.append(extra)
+        return hash((len(self.data),) + tuple(a.tobytes() for a in arrays))
+
+    def _strategy_keys(self, strategy):
+        """Keys of the dataset values read by a freq. offset estimation strategy
+
+        Args:
+            strategy : Select between one-way, one-way-reversed, and two-way.
+
+        Returns:
+            (tuple) Keys of the dataset values (see _get_array) read by the
+            frequency offset estimation (see _y_est_for and _pkts).
+
+        """
+        if (strategy == "one-way"):
+            return ("t1", "t2")
+        elif (strategy == "one-way-reversed"):
+            return ("t3", "t4")
+        elif (self.pkts is not None):
+            return ("t1", "t2", "t3", "t4")
+        else:
+            return ("t1", "x_est")
+
     def _is_cached_cfg_valid(self, cfg, target_cfg):
         """Check if the cached configuration is valid
 
@@ -64,7 +559,8 @@ class Estimator():
 
         return True
 
-    def _eval_drift_err(self, loss, criterion, n_samples=0, N=8192):
+    def _eval_drift_err(self, loss, criterion, n_samples=0,
+                        N=_DRIFT_ERR_WIN):
         """Evaluate the drift estimation error relative to true drift
 
         Assess the quality of the drift estimates by comparing them to the true
@@ -93,8 +589,9 @@ class Estimator():
         optimize the drifts such that they do not deviate too much from the true
         drifts over short-term windows.
 
-        This function uses the drift estimates and true time offset values that
-        are available internally on self.data.
+        This function uses the drift estimates held internally by the
+        estimator (or available on self.data) and the true time offset values
+        from self.data.
 
         Args:
             loss      : Loss function (mse or max-error)
@@ -113,55 +610,20 @@ class Estimator():
         assert(loss in ["mse", "max-error"])
 
         # Instantaneous true and estimated drifts
-        true_drift = np.array([(r["x"] - self.data[i-1]["x"])
-                               for i,r in enumerate(self.data)
-                               if "drift" in r])
-        drift_est  = np.array([r["drift"] for r in self.data
-                               if "drift" in r])
-
-        if (criterion == 'instantaneous'):
-            drift_err  = (drift_est - true_drift)[-n_samples:]
-            if (loss == "mse"):
-                return np.square(drift_err).mean()
-            elif (loss == "max-error"):
-                return np.amax(np.abs(drift_err))
-
-        # Running-sum of drifts over a rolling window of N samples. If there is
-        # less than N samples in the dataset, use a cumulative sum.
-        if (len(self.data) <= N):
-            true_cum_drift = true_drift.cumsum()
-            cum_drift_est  = drift_est.cumsum()
+        drift = self._get_est("drift")
+        dx    = self._get_array("dx")
+        if ("drift" in self._est_start):
+            # Drift estimates known to span a contiguous tail of the dataset
+            i_s        = self._est_start["drift"]
+            true_drift = dx[i_s:]
+            drift_est  = drift[i_s:]
         else:
-            h              = np.ones(N)
-            true_cum_drift = np.convolve(true_drift, h, mode="valid")
-            cum_drift_est  = np.convolve(drift_est, h, mode="valid")
-
-        # Normalized cumulative drift estimation errors
-        #
-        # Normalize by the absolute of the true drifts such that different
-        # frequency offsets (with varying levels of drifts) are equally
-        # weighted. For example, with 128 sample per second, a 10 ppb offset
-        # leads to drifts in the order of 10 ns when accumulated over N=128,
-        # whereas a 100 ppb freq. offset yields cumulative drifts in the order
-        # of 100 ns. If we estimate cumulative drifts of 9 ns and 90 ns,
-        # respectively, the absolute errors are 1 ns and 10 ns, respectively,
-        # which are unfair to compare (e.g., the max-error loss will focus on
-        # high frequency offsets). In contrast, the normalized errors are 0.1 in
-        # both cases, which can be compared fairly.
-        #
-        # To avoid Inf values, return zero for the normalized error everywhere
-        # the true cumulative drift (the normalization factor) presents zero
-        # values. Sometimes the cumulative error window has a net cumulative
-        # drift of zero nanoseconds, which leads to this scenario.
-        cum_drift_err      = (cum_drift_est - true_cum_drift)[-n_samples:]
-        norm_factor        = np.abs(true_cum_drift[-n_samples:])
-        norm_cum_drift_err = np.divide(cum_drift_err, norm_factor,
-                                       out = np.zeros_like(cum_drift_err),
-                                       where = (norm_factor != 0))
-        if (loss == "mse"):
-            return np.square(norm_cum_drift_err).mean()
-        elif (loss == "max-error"):
-            return np.amax(np.abs(norm_cum_drift_err))
+            idx        = np.nonzero(~np.isnan(drift))[0]
+            true_drift = dx[idx]
+            drift_est  = drift[idx]
+
+        return _drift_err(drift_est, true_drift, loss, criterion, n_samples,
+                          N, cumulative=(len(self.data) <= N))
 
     def _get_window_range(self, max_window_span):
         """Compute the range of window lengths for frequency offset estimates
@@ -205,7 +667,36 @@ class Estimator():
 
         return window_len, pkts_window_len
 
-    def _pkts(self, strategy):
+    def _window_grid(self, max_window_span):
+        """Set up the window length search of the window optimizers
+
+        Args:
+            max_window_span : Maximum fraction of the dataset to be occupied by
+                              the observation window.
+
+        Returns:
+            Tuple with the window lengths to try for frequency offset
+            estimation and for the packet filtering layer (see
+            _get_window_range), and the number of samples guaranteed to be
+            available for all window lengths.
+
+        """
+        window_len, pkts_window_len = self._get_window_range(max_window_span)
+
+        # Number of samples guaranteed to be available for all window lengths
+        n_samples = int(np.floor((1 - max_window_span)*len(self.data)))
+        assert(n_samples > 0)
+
+        logger.info("Optimize observation window")
+        logger.info("Try from N = {} to N = {}".format(min(window_len),
+                                                       max(window_len)))
+        if (self.pkts is not None):
+            logger.info("Try {} from N = {} to N = {}".format(
+                self.pkts, min(pkts_window_len), max(pkts_window_len)))
+
+        return window_len, pkts_window_len, n_samples
+
+    def _pkts(self, delta, strategy):
         """Estimate the frequency offsets using packet selection pre-processing
 
         Based on timestamp differences:
@@ -220,6 +711,7 @@ class Estimator():
         frequency offset estimates.
 
         Args:
+            delta      : Observation interval in samples.
             strategy   : Select between one-way, one-way-reversed, and two-way.
                          The one-way strategy uses the m-to-s timestamps (t1 and
                          t2) only. The two-way strategy relies on the two-way
@@ -227,6 +719,10 @@ class Estimator():
                          timestamps (t1, t2, t3, and t4). The reversed one-way
                          strategy uses the s-to-m timestamps (t3 and t4) only.
 
+        Returns:
+            (np.ndarray) Frequency offset estimates corresponding to the last
+            entries of the dataset, starting from index "delta + N_pkts - 1".
+
         """
         assert(self.pkts is not None)
         assert(strategy in ["one-way", "one-way-reversed", "two-way"])
@@ -237,32 +733,31 @@ class Estimator():
              ptp.filters.moving_maximum
 
         if (strategy == "one-way"):
-            t1        = np.array([float(r["t1"]) for r in self.data])
-            t21       = np.array([float(r["t2"] - r["t1"]) for r in self.data])
+            t1        = self._get_array("t1")
+            t21       = self._get_array("t21")
             t21_min   = op(N, t21)
-            delta_t1  = t1[(self.delta + N - 1):] - t1[(N-1):-self.delta]
-            delta_t21 = t21_min[self.delta:] - t21_min[:-self.delta]
+            delta_t1  = t1[(delta + N - 1):] - t1[(N-1):-delta]
+            delta_t21 = t21_min[delta:] - t21_min[:-delta]
             y_est     = delta_t21 / delta_t1
         elif (strategy == "one-way-reversed"):
-            t4        = np.array([float(r["t4"]) for r in self.data])
-            t43       = np.array([float(r["t4"] - r["t3"]) for r in self.data])
+            t4        = self._get_array("t4")
+            t43       = self._get_array("t43")
             t43_min   = op(N, t43)
-            delta_t4  = t4[(self.delta + N - 1):] - t4[(N-1):-self.delta]
-            delta_t43 = t43_min[self.delta:] - t43_min[:-self.delta]
+            delta_t4  = t4[(delta + N - 1):] - t4[(N-1):-delta]
+            delta_t43 = t43_min[delta:] - t43_min[:-delta]
             y_est     = -delta_t43 / delta_t4
         elif (strategy == "two-way"):
-            t1        = np.array([float(r["t1"]) for r in self.data])
-            t21       = np.array([float(r["t2"] - r["t1"]) for r in self.data])
-            t43       = np.array([float(r["t4"] - r["t3"]) for r in self.data])
+            t1        = self._get_array("t1")
+            t21       = self._get_array("t21")
+            t43       = self._get_array("t43")
             t21_min   = op(N, t21)
             t43_min   = op(N, t43)
-            delta_t1  = t1[(self.delta + N - 1):] - t1[(N-1):-self.delta]
-            delta_t21 = t21_min[self.delta:] - t21_min[:-self.delta]
-            delta_t43 = t43_min[self.delta:] - t43_min[:-self.delta]
+            delta_t1  = t1[(delta + N - 1):] - t1[(N-1):-delta]
+            delta_t21 = t21_min[delta:] - t21_min[:-delta]
+            delta_t43 = t43_min[delta:] - t43_min[:-delta]
             y_est     = 0.5 * (delta_t21 - delta_t43) / delta_t1
 
-        for i,r in enumerate(self.data[(self.delta + N -1):]):
-            r["y_est"] = y_est[i]
+        return y_est
 
     def process(self, strategy="two-way"):
         """Process the data
@@ -297,37 +792,44 @@ class Estimator():
         assert(strategy in ["one-way", "one-way-reversed", "two-way"])
         logger.info("Processing with N=%d" %(self.delta))
 
-        # Remove previous estimates in case they already exist
-        for r in self.data:
-            r.pop("y_est", None)
+        self._set_est("y_est", self._y_est_for(self.delta, strategy))
+        self.sync_back("y_est")
+
+    def _y_est_for(self, delta, strategy):
+        """Compute the frequency offset estimates for a given window length
+
+        Args:
+            delta    : Observation interval in samples.
+            strategy : Select between one-way, one-way-reversed, and two-way.
+
+        Returns:
+            (np.ndarray) Frequency offset estimates corresponding to the last
+            entries of the dataset. The dataset entries preceding the first
+            full observation window do not have a corresponding estimate.
 
+        """
         if (self.pkts is not None):
-            self._pkts(strategy)
-            return
+            return self._pkts(delta, strategy)
 
         if (strategy == "one-way"):
-            t1           = np.array([float(r["t1"]) for r in self.data])
-            t2           = np.array([float(r["t2"]) for r in self.data])
-            delta_slave  = t2[self.delta:] - t2[:-self.delta]
-            delta_master = t1[self.delta:] - t1[:-self.delta]
-            y_est        = (delta_slave - delta_master) / delta_master
+            delta_slave  = self._delta("t2", delta, "slave")
+            delta_master = self._delta("t1", delta, "master")
+            y_est        = delta_slave - delta_master
         elif (strategy == "one-way-reversed"):
-            t3           = np.array([float(r["t3"]) for r in self.data])
-            t4           = np.array([float(r["t4"]) for r in self.data])
-            delta_slave  = t3[self.delta:] - t3[:-self.delta]
-            delta_master = t4[self.delta:] - t4[:-self.delta]
-            y_est        = (delta_slave - delta_master) / delta_master
+            delta_slave  = self._delta("t3", delta, "slave")
+            delta_master = self._delta("t4", delta, "master")
+            y_est        = delta_slave - delta_master
         elif (strategy == "two-way"):
-            t1           = np.array([float(r["t1"]) for r in self.data])
-            x_est        = np.array([float(r["x_est"]) for r in self.data])
-            delta_x      = x_est[self.delta:] - x_est[:-self.delta]
-            delta_master = t1[self.delta:] - t1[:-self.delta]
-            y_est        = delta_x / delta_master
+            x_est        = self._get_array("x_est")
+            delta_master = self._delta("t1", delta, "master")
+            y_est        = x_est[delta:] - x_est[:-delta]
+
+        y_est /= delta_master
 
-        for i,r in enumerate(self.data[self.delta:]):
-            r["y_est"] = y_est[i]
+        return y_est
 
-    def optimize_to_y(self, strategy, loss="mse", max_window_span=0.2):
+    def optimize_to_y(self, strategy, loss="mse", max_window_span=0.2,
+                      force=False):
         """Optimize the observation interval used for freq. offset estimation
 
         Optimizes the observation interval used for unbiased frequency offset
@@ -341,6 +843,10 @@ class Estimator():
         computation affects results and may render the optimization below less
         effective for drift compensation.
 
+        The frequency offset estimates obtained with the optimal window lengths
+        are saved on the dataset, so callers do not need to call process()
+        afterwards.
+
         Args :
             strategy        : Unbiased frequency offset estimation strategy.
             loss            : Loss function used to optimize the window length
@@ -350,24 +856,31 @@ class Estimator():
                               the maximum tolerable latency to obtain the first
                               frequency offset estimate (by the end of the first
                               observation window).
+            force           : Force processing even if the optimal window
+                              lengths were already found by a previous call
+                              with the same dataset and parameters.
 
         """
         assert(strategy in ["one-way", "one-way-reversed", "two-way"])
         assert(loss in ["mse", "max-error"])
 
-        # Window length ranges
-        window_len, pkts_window_len = self._get_window_range(max_window_span)
-
-        # Number of samples guaranteed to be available for all window lengths
-        n_samples = int(np.floor((1 - max_window_span)*len(self.data)))
-        assert(n_samples > 0)
+        # True frequency offsets and entries where they are available
+        rtc_y     = self._get_est("rtc_y")
+        has_truth = ~np.isnan(rtc_y)
+        all_truth = has_truth.all()
+
+        # Reuse the result of a previous optimization over the same dataset
+        opt_key = ("y", self._fingerprint(*self._strategy_keys(strategy),
+                                          extra=rtc_y),
+                   strategy, loss, max_window_span, self.pkts)
+        opt_result = None if force else _opt_lookup(opt_key)
+        if (opt_result is not None):
+            self.delta, self.N_pkts = opt_result
+            self.process(strategy)
+            return
 
-        logger.info("Optimize observation window" %())
-        logger.info("Try from N = {} to N = {}".format(min(window_len),
-                                                       max(window_len)))
-        if (self.pkts is not None):
-            logger.info("Try {} from N = {} to N = {}".format(
-                self.pkts, min(pkts_window_len), max(pkts_window_len)))
+        window_len, pkts_window_len, n_samples = self._window_grid(
+            max_window_span)
 
         min_error  = np.inf
         N_opt      = 0
@@ -375,21 +888,21 @@ class Estimator():
         for N_pkts in pkts_window_len:
             for N in window_len:
                 # Re-estimate using new window lengths
-                self.delta  = N
                 self.N_pkts = N_pkts
-                self.process(strategy)
+                y_est       = self._y_est_for(N, strategy)
 
-                # Estimation error
-                y_err = np.array([ 1e9*(r["y_est"] - r["rtc_y"])
-                                   for r in self.data[self.delta:]
-                                   if ("y_est" in r and "rtc_y" in r) ])
+                # Estimation error over the entries with a true frequency
+                # offset, computed in place over the (fresh) y_est array
+                i_s   = len(rtc_y) - len(y_est)
+                y_err = np.subtract(y_est, rtc_y[i_s:], out=y_est)
+                if (not all_truth):
+                    y_err = y_err[has_truth[i_s:]]
 
-                if (loss == "mse"):
-                    error = np.square(y_err[:n_samples]).mean()
-                    # Only use `n_samples` out of y_err. This way, all window
-                    # lengths are compared based on the same number of samples.
-                elif (loss == "max-error"):
-                    error = np.amax(np.abs(y_err[:n_samples]))
+                # Only use `n_samples` out of y_err. This way, all window
+                # lengths are compared based on the same number of samples.
+                y_err  = y_err[:n_samples]
+                y_err *= 1e9
+                error  = _loss(y_err, loss)
 
                 if (error < min_error):
                     N_opt      = N
@@ -397,11 +910,15 @@ class Estimator():
                     min_error = error
 
         loss_label = "MSE" if loss == "mse" else "Max|Error|"
-        logger.info("Minimum {}: {} ppb".format(loss_label, error))
+        logger.info("Minimum {}: {} ppb".format(loss_label, min_error))
         logger.info("Optimum N: {}".format(N_opt))
         logger.info("Optimum N_pkts: {}".format(N_pkts_opt))
         self.delta  = N_opt
         self.N_pkts = N_pkts_opt
+        _opt_store(opt_key, (N_opt, N_pkts_opt))
+
+        # Save the estimates obtained with the optimal window lengths
+        self.process(strategy)
 
     def optimize_to_drift(self, strategy, loss="mse", criterion='cumulative',
                           max_window_span=0.2, cache=None,
@@ -427,8 +944,9 @@ class Estimator():
             cache           : Cache handler used to save the optimal
                               configuration on a JSON file.
             cache_id        : Cache object identifier.
-            force           : Force processing even if a configuration file with
-                              the optimal parameters already exists in cache.
+            force           : Force processing even if the optimal parameters
+                              were already found by a previous call or exist in
+                              the cache file.
 
         Note:
             The cumulative criterion typically leads to better optimization
@@ -445,6 +963,11 @@ class Estimator():
             uncertainty (e.g., 8 ns). Consequently, the optimization based on
             cumulative error considers the actual drift estimation errors.
 
+            The candidate windows are scored on arrays held by the estimator.
+            Only the frequency offset and drift estimates obtained with the
+            optimal window lengths are saved on the dataset, so callers do not
+            need to call process() and estimate_drift() afterwards.
+
         """
         assert(strategy in ["one-way", "one-way-reversed", "two-way"])
         assert(criterion in ['cumulative', 'instantaneous'])
@@ -467,49 +990,50 @@ class Estimator():
                 if (self._is_cached_cfg_valid(cached_cfg, target_cfg)):
                     self.delta  = cached_cfg['N']
                     self.N_pkts = cached_cfg['N_pkts']
+                    self.process(strategy)
+                    self.estimate_drift()
                     return
         else:
             logger.info("Unable to find cached configuration file")
 
-        # Window length ranges
-        window_len, pkts_window_len = self._get_window_range(max_window_span)
-
-        # Number of samples guaranteed to be available for all window lengths
-        n_samples = int(np.floor((1 - max_window_span)*len(self.data)))
-        assert(n_samples > 0)
-
-        logger.info("Optimize observation window")
-        logger.info("Try from N = {} to N = {}".format(min(window_len),
-                                                       max(window_len)))
-        if (self.pkts is not None):
-            logger.info("Try {} from N = {} to N = {}".format(
-                self.pkts, min(pkts_window_len), max(pkts_window_len)))
-
-        m_error    = np.inf
-        N_opt      = 0
-        N_pkts_opt = 0
-        for N_pkts in pkts_window_len:
-            for N in window_len:
-                # Re-estimate using new window lengths
-                self.delta  = N
-                self.N_pkts = N_pkts
-                self.process(strategy)
-                self.estimate_drift()
-
-                # Estimation error
-                error = self._eval_drift_err(loss, criterion, n_samples)
-
-                if (error < m_error):
-                    m_error  = error
-                    N_opt    = N
-                    N_pkts_opt = N_pkts
-
-        loss_label = "MSE" if loss == "mse" else "Max|Error|"
-        logger.info("Minimum {}: {} ppb".format(loss_label, m_error))
-        logger.info("Optimum N: {}".format(N_opt))
-        logger.info("Optimum N_pkts: {}".format(N_pkts_opt))
-        self.delta  = N_opt
-        self.N_pkts = N_pkts_opt
+        # Reuse the result of a previous optimization over the same dataset. The
+        # drift evaluation further reads t1 and the true time offsets.
+        keys    = self._strategy_keys(strategy)
+        keys   += tuple(k for k in ("t1", "x") if k not in keys)
+        opt_key = ("drift", self._fingerprint(*keys),
+                   strategy, loss, criterion, max_window_span, self.pkts)
+        # NOTE: on a hit, the optimal configuration is still saved to the cache
+        # file below, which may not exist yet for this cache/cache_id.
+        opt_result = None if force else _opt_lookup(opt_key)
+        if (opt_result is None):
+            window_len, pkts_window_len, n_samples = self._window_grid(
+                max_window_span)
+
+            m_error    = np.inf
+            N_opt      = 0
+            N_pkts_opt = 0
+            for N_pkts in pkts_window_len:
+                for N in window_len:
+                    # Re-estimate using new window lengths
+                    self.N_pkts = N_pkts
+                    error       = self._score_window(N, strategy, loss,
+                                                     criterion, n_samples)
+
+                    if (error < m_error):
+                        m_error  = error
+                        N_opt    = N
+                        N_pkts_opt = N_pkts
+
+            loss_label = "MSE" if loss == "mse" else "Max|Error|"
+            logger.info("Minimum {}: {} ppb".format(loss_label, m_error))
+            logger.info("Optimum N: {}".format(N_opt))
+            logger.info("Optimum N_pkts: {}".format(N_pkts_opt))
+            opt_result = (N_opt, N_pkts_opt)
+            _opt_store(opt_key, opt_result)
+
+        N_opt, N_pkts_opt = opt_result
+        self.delta        = N_opt
+        self.N_pkts       = N_pkts_opt
 
         # Save optimal configuration and metadata to cache
         if (cache is not None):
@@ -523,6 +1047,40 @@ class Estimator():
                         'N_pkts'        : int(N_pkts_opt)},
                        identifier=cache_id)
 
+        # Save the estimates obtained with the optimal window lengths
+        self.process(strategy)
+        self.estimate_drift()
+
+    def _score_window(self, delta, strategy, loss, criterion, n_samples,
+                      N=_DRIFT_ERR_WIN):
+        """Evaluate the drift estimation error obtained with a given window
+
+        Equivalent to estimating the frequency offsets and drifts and then
+        calling _eval_drift_err(), but operating directly on the tail of the
+        dataset that has estimates. This avoids the NaN-padded intermediate
+        arrays and the search for the entries that contain drift estimates.
+
+        Args:
+            delta     : Observation interval in samples.
+            strategy  : Unbiased frequency offset estimation strategy.
+            loss      : Loss function (mse or max-error).
+            criterion : Error criterion (cumulative or instantaneous).
+            n_samples : Number of drift samples to consider.
+            N         : Number of drift estimates to accumulate in a window.
+
+        Returns:
+            Scalar value representing the MSE or max|error| of the drift
+            estimates.
+
+        """
+        y_est      = self._y_est_for(delta, strategy)
+        i_s        = len(self.data) - len(y_est)
+        drift_est  = np.multiply(y_est, self._get_array("dt1")[i_s:],
+                                 out=y_est)
+        true_drift = self._get_array("dx")[i_s:]
+        return _drift_err(drift_est, true_drift, loss, criterion, n_samples,
+                          N, cumulative=(len(self.data) <= N))
+
     def set_truth(self, delta=None):
         """Set "true" frequency offset based on "true" time offset measurements
 
@@ -534,18 +1092,15 @@ class Estimator():
                     'i-2', and so on. When set to None, use the delta value
                     set in self.delta (default: None)
         """
-        for r in self.data:
-            r.pop("rtc_y", None)
-
         delta = delta or self.delta
-        t1    = np.array([float(r["t1"]) for r in self.data])
-        x     = np.array([r["x"] for r in self.data])
+        t1    = self._get_array("t1")
+        x     = self._get_array("x")
         dx    = x[delta:] - x[:-delta]
         dt1   = t1[delta:] - t1[:-delta]
         y     = dx / dt1
 
-        for i,r in enumerate(self.data[delta:]):
-            r["rtc_y"] = y[i]
+        self._set_est("rtc_y", y)
+        self.sync_back("rtc_y")
 
     def estimate_drift(self):
         """Estimate the incremental drifts due to frequency offset
@@ -559,18 +1114,24 @@ class Estimator():
         Estimate these incremental changes and save on the dataset.
 
         """
-        # Clean previous estimates
-        for r in self.data:
-            r.pop("drift", None)
-
-        # Compute the drift within the observation window
-        for i,r in enumerate(self.data[1:]):
-            if ("y_est" in r):
-                delta = float(r["t1"] - self.data[i]["t1"])
-                # NOTE: index i is the enumerated index, not the data entry
-                # index. Since we get self.data[1:] (i.e. starting from index
-                # 1), "i" lags the actual data index by 1.
-                r["drift"] = r["y_est"] * delta
+        self._estimate_drift()
+        self.sync_back("drift")
+
+    def _estimate_drift(self):
+        """Estimate the incremental drifts without saving them on the dataset"""
+        dt1   = self._get_array("dt1")
+        y_est = self._get_est("y_est")
+
+        # Entries without a frequency offset estimate result in NaN drifts
+        drift     = np.full(len(self.data), np.nan)
+        drift[1:] = y_est[1:] * dt1[1:]
+        self._est["drift"] = drift
+
+        # The drifts span the same tail as the frequency offset estimates
+        if ("y_est" in self._est_start):
+            self._est_start["drift"] = max(self._est_start["y_est"], 1)
+        else:
+            self._est_start.pop("drift", None)
 
     def _calc_loop_constants(self, damping, loopbw):
         """Compute the proportional and integral gains
@@ -579,14 +1140,7 @@ class Estimator():
         Approach. Appendix C."
 
         """
-        theta_n  = loopbw / (damping + (1.0/(4 * damping)))
-        denomin  = (1 + 2*damping*theta_n + (theta_n**2))
-        Kp_K0_K1 = (4 * damping * theta_n) / denomin
-        Kp_K0_K2 = (4 * (theta_n**2)) / denomin
-        # And since Kp and K0 are assumed unitary
-        Kp       = Kp_K0_K1 # proportional gain
-        Ki       = Kp_K0_K2 # integrator gain
-        return Kp, Ki
+        return _loop_constants(damping, loopbw)
 
     def loop(self, damping=1.0, loopbw=0.001, settling=0.2):
         """Estimate time offset drifts using PI loop
@@ -619,38 +1173,83 @@ class Estimator():
                        Results are only saved after this portion of the dataset.
 
         """
+        self._loop(damping, loopbw, settling)
+        self.sync_back("drift", "x_loop")
+
+    def _loop(self, damping, loopbw, settling):
+        """Run the PI loop without saving the estimates on the dataset"""
         logger.debug("Run PI loop with damping {:f} and loop bw {:f}".format(
             damping, loopbw))
 
         Kp, Ki = self._calc_loop_constants(damping, loopbw)
 
-        # Clean previous estimates
-        for r in self.data:
-            r.pop("drift", None)
-            r.pop("x_loop", None)
-
         # Index after which the loop is assumed to be settled
         i_settling = int(np.floor(settling * len(self.data)))
 
-        # Run loop
-        f_int = 0
-        dds   = self.data[0]["x_est"]
+        # Run loop and keep the estimates obtained after settling
+        drift, x_loop = _pi_loop(self._get_array("x_est"), Kp, Ki)
+        self._set_est("drift", drift[i_settling:])
+        self._set_est("x_loop", x_loop[i_settling:])
+
+    def _eval_loop_grid(self, damping_vec, loopbw_vec, settling, loss,
+                        criterion, max_workers=1):
+        """Evaluate the drift estimation error over a grid of loop parameters
 
-        for i, r in enumerate(self.data):
-            x_est      = r["x_est"]
-            err        = x_est - dds
-            f_prop     = Kp * err
-            f_int     += Ki * err
-            f_err      = f_prop + f_int
+        By default, the grid is evaluated within the calling process.
+        Optionally, it can be evaluated in parallel, with one task per damping
+        factor submitted to a pool of worker processes. Each task receives only
+        the time offset estimates and true drifts, rather than the (much larger)
+        dataset.
 
-            if (i >= i_settling):
-                r["drift"]  = f_err
-                r["x_loop"] = dds
+        NOTE: with the "spawn" and "forkserver" start methods of
+        multiprocessing, the worker processes re-import the main module. Hence,
+        the parallel evaluation requires the calling script to be protected by
+        an 'if __name__ == "__main__":' guard.
 
-            dds += f_err
+        NOTE: there is no need to restrict the range of samples to be used in
+        the error evaluation. The loop only keeps the estimates that are past
+        the desired transient. Hence, all samples considered in the evaluation
+        are already within the desired portion of the dataset.
+
+        Args:
+            damping_vec : Damping factors to evaluate
+            loopbw_vec  : Loop bandwidths to evaluate
+            settling    : Fraction of the dataset over which the loop can settle
+            loss        : Loss function (mse or max-error)
+            criterion   : Error criterion (cumulative or instantaneous)
+            max_workers : Maximum number of worker processes. When set to 1
+                          (default), evaluate the grid within the calling
+                          process. When None, use as many worker processes as
+                          processors.
+
+        Returns:
+            (np.ndarray) Matrix with the drift estimation error obtained with
+            each damping factor (rows) and loop bandwidth (columns).
+
+        """
+        # The true drifts do not depend on the loop parameters, so compute
+        # them once for all configurations
+        x_est      = self._get_array("x_est")
+        i_settling = int(np.floor(settling * len(self.data)))
+        true_drift = self._get_array("dx")[i_settling:]
+
+        if (max_workers == 1):
+            rows = [_eval_loop_row(x_est, true_drift, damping, loopbw_vec,
+                                   i_settling, loss, criterion)
+                    for damping in damping_vec]
+        else:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                futures = [executor.submit(_eval_loop_row, x_est, true_drift,
+                                           damping, loopbw_vec, i_settling,
+                                           loss, criterion)
+                           for damping in damping_vec]
+                rows    = [f.result() for f in futures]
+
+        return np.array(rows)
 
     def optimize_loop(self, criterion='cumulative', loss="mse", cache=None,
-                      cache_id='loop', force=False, max_transient=0.2):
+                      cache_id='loop', force=False, max_transient=0.2,
+                      max_workers=1):
         """Find loop parameters that minimize the drift estimation error
 
         Tries some pre-defined damping factor and loop bandwidth values.
@@ -667,12 +1266,18 @@ class Estimator():
             cache         : Cache handler used to save the optimal configuration
                             on a JSON file.
             cache_id      : Cache object identifier
-            force         : Force processing even if a configuration file with
-                            the optimal parameters already exists in cache.
+            force         : Force processing even if the optimal parameters
+                            were already found by a previous call or exist in
+                            the cache file.
             max_transient : Maximum fraction of the dataset to be occupied by
                             the transient phase of the loop. This parameter
                             controls the maximum tolerable latency to obtain the
                             first drift estimates.
+            max_workers   : Maximum number of worker processes used to evaluate
+                            the candidate configurations. By default (1),
+                            evaluate them within the calling process. When
+                            None, use as many worker processes as processors
+                            (see _eval_loop_grid).
 
         """
         assert(criterion in ['cumulative', 'instantaneous'])
@@ -697,39 +1302,32 @@ class Estimator():
         else:
             logger.info("Unable to find cached configuration file")
 
-        damping_vec  = [0.5, 0.707, 1.0, 1.2, 1.5, 1.8, 2.0]
-        loopbw_vec   = np.concatenate((
-            np.arange(0.1, 1.0, 0.1),
-            np.arange(0.01, 0.1, 0.01),
-            np.arange(0.001, 0.01, 0.001),
-            np.arange(0.0001, 0.001, 0.0001),
-            np.arange(0.00001, 0.0001, 0.00001)))
-        m_error      = np.inf
-        best_damping = None
-        best_loopbw  = None
-
-        for damping in damping_vec:
-            for loopbw in loopbw_vec:
-                # Run loop with the given configurations
-                self.loop(damping = damping, loopbw = loopbw,
-                          settling=max_transient)
-
-                # Evaluate the drift estimation error
-                error = self._eval_drift_err(loss, criterion)
-                # NOTE: there is no need to restrict the range of samples to be
-                # used in this error evaluation. The loop only saves the
-                # estimates that are past the desired transient. Hence, all
-                # samples considered within self._eval_drift_err() are already
-                # within the desired portion of the dataset used for analysis.
-
-                if (error < m_error):
-                    m_error      = error
-                    best_damping = damping
-                    best_loopbw  = loopbw
-
-        logger.info("PI loop optimization")
-        logger.info("Damping factor: {:f}".format(best_damping))
-        logger.info("Loop bandwidth: {:f}".format(best_loopbw))
+        # Reuse the result of a previous optimization over the same dataset
+        opt_key = ("loop", self._fingerprint("x_est", "x"), criterion, loss,
+                   max_transient)
+        # NOTE: on a hit, the optimal configuration is still saved to the cache
+        # file below, which may not exist yet for this cache/cache_id.
+        opt_result = None if force else _opt_lookup(opt_key)
+        if (opt_result is None):
+            damping_vec = _DAMPING_VEC
+            loopbw_vec  = _LOOPBW_VEC
+
+            # Evaluate the drift estimation error over the grid of
+            # configurations and pick the configuration with minimum error
+            errors = self._eval_loop_grid(damping_vec, loopbw_vec,
+                                          max_transient, loss, criterion,
+                                          max_workers)
+            i_best, j_best = np.unravel_index(np.nanargmin(errors),
+                                              errors.shape)
+            best_damping   = damping_vec[i_best]
+            best_loopbw    = loopbw_vec[j_best]
+
+            logger.info("PI loop optimization")
+            logger.info("Damping factor: {:f}".format(best_damping))
+            logger.info("Loop bandwidth: {:f}".format(best_loopbw))
+            _opt_store(opt_key, (best_damping, best_loopbw))
+        else:
+            best_damping, best_loopbw = opt_result
 
         # Save optimal configuration and metadata to cache
         if (cache is not None):
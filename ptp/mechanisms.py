@@ -1,11 +1,16 @@
 """PTP packet exchange mechanisms
 """
 import logging
+import numpy as np
 from .timestamping import *
 
 logger = logging.getLogger("DelayReqResp")
 
 class DelayReqResp():
+    # One instance is created per exchange, so avoid the per-instance dict
+    __slots__ = ('seq_num', 't1', 't2', 't3', 't4', 'd_fw', 'd_bw', 'toffset',
+                 'asymmetry')
+
     def __init__(self, seq_num, t1):
         """Delay request-response mechanism
 
@@ -37,6 +42,11 @@ class DelayReqResp():
             print_fn = logger.info
         else:
             print_fn = logger.debug
+            level    = logging.DEBUG
+
+        # Skip the formatting when the message would be discarded anyway
+        if (not logger.isEnabledFor(level)):
+            return
 
         print_fn(("-----------------------------------------------"
                   "---------------------------------"))
@@ -131,6 +141,35 @@ class DelayReqResp():
         offset_from_master = ((self.t2 - self.t1) - (self.t4 - self.t3)) / 2
         return offset_from_master
 
+    @staticmethod
+    def process_batch(t1, t2, t3, t4):
+        """Estimate the delays and time offsets of a batch of exchanges
+
+        Vectorized alternative to calling process() on each exchange when the
+        timestamps are already available as arrays. Unlike Timestamp objects,
+        float64 values only hold about 16 significant digits. Hence, the
+        timestamps should be given relative to a common reference (e.g., the
+        first t1) in order to preserve ns resolution.
+
+        Args:
+            t1 : Array of Sync departure timestamps in ns
+            t2 : Array of Sync arrival timestamps in ns
+            t3 : Array of Delay_Req departure timestamps in ns
+            t4 : Array of Delay_Req arrival timestamps in ns
+
+        Returns:
+            Tuple with the arrays of delay estimates and time offset estimates
+            in ns.
+
+        """
+        t1 = np.asarray(t1, dtype=np.float64)
+        t2 = np.asarray(t2, dtype=np.float64)
+        t3 = np.asarray(t3, dtype=np.float64)
+        t4 = np.asarray(t4, dtype=np.float64)
+        delay_est   = ((t4 - t1) - (t3 - t2)) / 2
+        toffset_est = ((t2 - t1) - (t4 - t3)) / 2
+        return delay_est, toffset_est
+
     def set_true_toffset(self, master_tstamp, slave_tstamp):
         """Save the true time offset
 
@@ -201,6 +240,11 @@ class DelayReqResp():
             print_fn = logger.info
         else:
             print_fn = logger.debug
+            level    = logging.DEBUG
+
+        # Skip the formatting when the message would be discarded anyway
+        if (not logger.isEnabledFor(level)):
+            return
 
         print_fn(('{:^4d} {:^ 12.1f} {:^ 12.1f} '
                   '{:^ 9.1f} {:^9.1f} '
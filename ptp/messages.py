@@ -4,9 +4,25 @@ import logging, heapq
 import numpy as np
 
 
+logger = logging.getLogger("PtpEvt")
+
+# Number of random samples drawn at once and buffered for the following
+# messages (see PtpEvt._gamma_rnd, PtpEvt._mirrored_erlang_rnd, and
+# PtpEvt._tx_uncertainty_rnd)
+_RND_BUF_LEN = 4096
+
+
 class PtpEvt():
+    # Attributes are accessed in every iteration of the simulation loop
+    __slots__ = ('name', 'period_sec', 'on_way', 'next_tx', 'next_rx',
+                 'seq_num', 'tx_tstamp', 'rx_tstamp', 'one_way_delay',
+                 'pdv_distr', 'gamma_scale', 'gamma_shape', '_rng',
+                 '_gamma_buf', '_gamma_idx', '_erlang_buf', '_erlang_idx',
+                 '_erlang_fx_ms', '_erlang_cdf_ms', '_erlang_fx_sm',
+                 '_erlang_cdf_sm', '_delay_rnd', '_tx_unc_buf', '_tx_unc_idx')
+
     def __init__(self, name, period_sec=None, pdv_distr="Gamma",
-                 gamma_shape=None, gamma_scale=None):
+                 gamma_shape=None, gamma_scale=None, seed=None):
         """PTP Event Message
 
         Controls transmission and reception of a PTP event message. When the
@@ -19,19 +35,23 @@ class PtpEvt():
             pdv_distr   : PDV distribution
             gamma_shape : Shape parameter of the Gamma distribution
             gamma_scale : Scale parameter of the Gamma distribution
+            seed        : Seed for the random number generator of the message
+                          (random PDV and Tx period uncertainty). When None,
+                          the generator is seeded with fresh OS entropy.
 
         """
 
         self.name          = name
         self.period_sec    = period_sec
         self.on_way        = False
-        self.next_tx       = float("inf")
-        self.next_rx       = float("inf")
+        self.next_tx       = None  # None while no Tx is scheduled
+        self.next_rx       = None  # only meaningful while on the way
         self.seq_num       = None
         self.tx_tstamp     = None
         self.rx_tstamp     = None
         self.one_way_delay = None
         self.pdv_distr     = pdv_distr
+        self._rng          = np.random.default_rng(seed)
 
         # Apply default gamma shape and scale if not defined. The default values
         # come from the fit for 60% load, 5-hop cross-traffic scenario in the
@@ -57,16 +77,33 @@ class PtpEvt():
 
         assert(pdv_distr in ["Gamma", "Gaussian", "mirrorGamma"])
 
+        # Buffers of Gamma and mirrored Erlang distributed delays (see
+        # _gamma_rnd and _mirrored_erlang_rnd)
+        self._gamma_buf  = []
+        self._gamma_idx  = 0
+        self._erlang_buf = []
+        self._erlang_idx = 0
+
+        # Buffer of Tx period uncertainties (see _tx_uncertainty_rnd)
+        self._tx_unc_buf = []
+        self._tx_unc_idx = 0
+
         # Prepare mirrored Gamma distribution if requested for the simulation
         if (pdv_distr == "mirrorGamma"):
             self._mirrored_erlang_pdf()
 
+        # Random delay generator of the chosen PDV distribution
+        self._delay_rnd = {
+            "Gamma"       : self._gamma_rnd,
+            "mirrorGamma" : self._mirrored_erlang_rnd,
+            "Gaussian"    : self._gaussian_rnd
+        }[pdv_distr]
+
     def _mirrored_erlang_pdf(self):
         """Generate mirrored Erlang pdfs from analytical expression"""
 
         k          = self.gamma_shape  # shape
         mu         = self.gamma_scale  # scale
-        lamb       = 1/mu              # rate
 
         # Maximum delay with non-zero probability
         #
@@ -80,41 +117,121 @@ class PtpEvt():
         max_val_ms = 21000
         max_val_sm = 18000
 
+        # NOTE: the Erlang pdf is "(lamb**k / (k-1)!) * x**(k-1) *
+        # exp(-lamb*x)", with rate "lamb = 1/mu". The constant prefactor is
+        # cancelled by the normalization of the pmf. Hence, compute only the
+        # terms that depend on x.
+
+        # NOTE: the pdfs are kept in their original (non-mirrored) order. The
+        # mirroring is applied when sampling, by reflecting the sampled index
+        # (see _mirrored_erlang_rnd).
+
         # Master-to-slave PDF
         x   = np.arange(0, max_val_ms, 1.0)
-        fx  = ((lamb**k)/np.math.factorial(k-1)) * (x ** (k-1)) * (np.exp(-lamb*x))
+        fx  = np.exp(-x/mu)
+        fx *= x ** (k-1)
         fx /= fx.sum()
-        fx  = np.flip(fx)
 
-        self._mirrored_erlang_fx_ms = fx
+        self._erlang_fx_ms  = fx
+        self._erlang_cdf_ms = self._cdf(fx)
 
         # Slave-to-master PDF
         x   = np.arange(0, max_val_sm, 1.0)
-        fx  = ((lamb**k)/np.math.factorial(k-1)) * (x ** (k-1)) * (np.exp(-lamb*x))
+        fx  = np.exp(-x/mu)
+        fx *= x ** (k-1)
         fx /= fx.sum()
-        fx  = np.flip(fx)
 
-        self._mirrored_erlang_fx_sm = fx
+        self._erlang_fx_sm  = fx
+        self._erlang_cdf_sm = self._cdf(fx)
+
+    @staticmethod
+    def _cdf(pmf):
+        """Compute the cumulative distribution of a probability mass function
+
+        Args:
+            pmf : Array with the probability of each value
+
+        Returns:
+            (np.ndarray) The normalized cumulative distribution.
+
+        """
+        cdf  = np.cumsum(pmf)
+        cdf /= cdf[-1]
+        return cdf
 
     def _mirrored_erlang_rnd(self):
         """Return a mirrored Erlang distributed random sample
 
         Numpy does not have a mirror Erlang distribution (it is not a well known
-        distribution, after all), so it is generated by passing in the pdf
-        vector and sampling based on these probabilities.
+        distribution, after all), so it is generated by inverse transform
+        sampling on the precomputed cumulative distribution. This is what
+        np.random.choice does when given the pdf vector, except that the
+        cumulative distribution is not recomputed on every call, and the
+        binary search takes O(log n) time. The sampled Erlang value "i" is
+        then mirrored into "max_val - 1 - i", where "max_val" is the length of
+        the pdf.
 
         """
 
-        # Generate random values using potentially different distributions in
-        # the master-to-slave and slave-to-master directions.
-        #
-        # FIXME remove hard-coded maximum values below
-        if self.name == "Sync":
-            max_val   = 21000
-            return np.random.choice(max_val, 1, p=self._mirrored_erlang_fx_ms)
-        else:
-            max_val   = 18000
-            return np.random.choice(max_val, 1, p=self._mirrored_erlang_fx_sm)
+        # Like in _gamma_rnd, sample a batch of delays at once and consume them
+        # over the following messages.
+        if (self._erlang_idx >= len(self._erlang_buf)):
+            # Generate random values using potentially different distributions
+            # in the master-to-slave and slave-to-master directions.
+            if self.name == "Sync":
+                cdf = self._erlang_cdf_ms
+            else:
+                cdf = self._erlang_cdf_sm
+
+            u                = self._rng.random(_RND_BUF_LEN)
+            idx              = cdf.searchsorted(u, side='right')
+            self._erlang_buf = (len(cdf) - 1 - idx).tolist()
+            self._erlang_idx = 0
+
+        delay_ns          = self._erlang_buf[self._erlang_idx]
+        self._erlang_idx += 1
+        return delay_ns
+
+    def _gamma_rnd(self):
+        """Return a Gamma distributed random delay sample in ns
+
+        Drawing a single sample from NumPy costs about the same as drawing
+        many, due to the per-call overhead. Hence, draw a batch of samples at
+        once and consume them over the following messages.
+
+        """
+        if (self._gamma_idx >= len(self._gamma_buf)):
+            self._gamma_buf = self._rng.gamma(shape=self.gamma_shape,
+                                              scale=self.gamma_scale,
+                                              size=_RND_BUF_LEN).tolist()
+            self._gamma_idx = 0
+
+        delay_ns         = self._gamma_buf[self._gamma_idx]
+        self._gamma_idx += 1
+        return delay_ns
+
+    def _gaussian_rnd(self):
+        """Return a Gaussian distributed random delay sample in ns"""
+        # FIXME set Gaussian params
+        return self._rng.normal(loc=2000, scale=200)
+
+    def _tx_uncertainty_rnd(self):
+        """Return a random uncertainty of the Tx period in ns
+
+        Like in _gamma_rnd, draw a batch of samples at once and consume them
+        over the following transmissions.
+
+        """
+        if (self._tx_unc_idx >= len(self._tx_unc_buf)):
+            # NOTE: we've measured around 1.5 microsecs of uncertainty on the
+            # interval between consecutive t1s
+            self._tx_unc_buf = self._rng.normal(0, 1500,
+                                                size=_RND_BUF_LEN).tolist()
+            self._tx_unc_idx = 0
+
+        uncertainty_ns    = self._tx_unc_buf[self._tx_unc_idx]
+        self._tx_unc_idx += 1
+        return uncertainty_ns
 
     def _sched_next_tx(self, tx_sim_time):
         """Compute next transmission time for periodic message
@@ -124,9 +241,7 @@ class PtpEvt():
 
         """
 
-        uncertainty_ns = np.random.normal(0, 1500)
-        # NOTE: we've measured around 1.5 microsecs of uncertainty on the
-        # interval between consecutive t1s
+        uncertainty_ns = self._tx_uncertainty_rnd()
 
         self.next_tx = tx_sim_time + self.period_sec + (uncertainty_ns * 1e-9)
 
@@ -138,19 +253,10 @@ class PtpEvt():
 
         """
 
-        if (self.pdv_distr == "Gamma"):
-            delay_ns = np.random.gamma(shape=self.gamma_shape,
-                                       scale=self.gamma_scale)
-        elif (self.pdv_distr == "mirrorGamma"):
-            delay_ns = self._mirrored_erlang_rnd()
-        elif (self.pdv_distr == "Gaussian"):
-            delay_ns = np.random.normal(loc=2000, scale=200)
-            # FIXME set Gaussian params
-
+        delay_ns     = self._delay_rnd()
         self.next_rx = tx_sim_time + (delay_ns * 1e-9)
 
-        logger = logging.getLogger("PtpEvt")
-        logger.debug("Delay of %s #%d: %f ns" %(self.name, self.seq_num, delay_ns))
+        logger.debug("Delay of %s #%d: %f ns", self.name, self.seq_num, delay_ns)
 
     def sched_tx(self, tx_sim_time, evts):
         """Manually schedule a transmission time
@@ -166,9 +272,25 @@ class PtpEvt():
         self.next_tx = tx_sim_time
         heapq.heappush(evts, self.next_tx)
 
-        logger = logging.getLogger("PtpEvt")
-        logger.debug("Schedule %s transmission to %f ns" %(self.name,
-                                                           self.next_tx * 1e9))
+        logger.debug("Schedule %s transmission to %f ns", self.name,
+                     self.next_tx * 1e9)
+
+    def next_evt_time(self):
+        """Return the earliest simulation time of a pending Tx or Rx
+
+        While the message is on the way, only its reception can happen.
+        Otherwise, only its (scheduled) transmission can.
+
+        Returns:
+            Simulation time in seconds, or infinity when no event is pending
+
+        """
+        if (self.on_way):
+            return self.next_rx
+        elif (self.next_tx is not None):
+            return self.next_tx
+        else:
+            return float("inf")
 
     def tx(self, sim_time, rtc_timestamp, evts):
         """Transmit message
@@ -196,9 +318,8 @@ class PtpEvt():
         else:
             self.seq_num += 1
 
-        logger = logging.getLogger("PtpEvt")
-        logger.debug("Transmitting %s #%d at %s" %(self.name, self.seq_num,
-                                                   sim_time))
+        logger.debug("Transmitting %s #%d at %s", self.name, self.seq_num,
+                     sim_time)
 
         # Schedule the next transmission for periodic messages. For non-periodic
         # messages, just clear the next Tx time.
@@ -231,19 +352,21 @@ class PtpEvt():
 
         """
 
-        # Do not receive before scheduled time or if there isn't a message on
-        # the way
-        if ((sim_time < self.next_rx) or (not self.on_way)):
+        # Do not receive if there isn't a message on the way or before the
+        # scheduled time
+        if ((not self.on_way) or (sim_time < self.next_rx)):
             return False
 
         # Proceed with reception
         self.on_way         = False
         self.rx_tstamp      = rx_rtc_tstamp
-        self.one_way_delay  = float(tx_rtc_tstamp - self.tx_tstamp)
-
-        logger = logging.getLogger("PtpEvt")
-        logger.debug("Received %s #%d at %s" %(self.name, self.seq_num,
-                                               sim_time))
-        logger.debug("One-way delay: %f" %(self.one_way_delay))
+        # NOTE: compute the difference in ns directly, rather than casting the
+        # difference Timestamp, to avoid instantiating a Timestamp
+        self.one_way_delay  = ((tx_rtc_tstamp.sec - self.tx_tstamp.sec) * 1e9) \
+                              + (tx_rtc_tstamp.ns - self.tx_tstamp.ns)
+
+        logger.debug("Received %s #%d at %s", self.name, self.seq_num,
+                     sim_time)
+        logger.debug("One-way delay: %f", self.one_way_delay)
 
         return True
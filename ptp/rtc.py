@@ -5,7 +5,15 @@ import random, logging, math, heapq
 from ptp.timestamping import Timestamp
 
 
+logger = logging.getLogger('Rtc')
+
 class Rtc():
+    # Attributes are accessed in every iteration of the simulation loop
+    __slots__ = ('ts_quantization', '_nom_freq_hz', 'label', 'inc_cnt',
+                 'freq_hz', 'inc_val_ns', 'phase_ns', 'time', 'toffset',
+                 't_last_inc', '_model_update_period_ns', '_model_sdev_freq_rw',
+                 '_model_sdev_time_rw', '_model_t_last_update')
+
     def __init__(self, nom_freq_hz, resolution_ns, tol_ppb = 0.0,
                  norm_var_freq_rw = 0.0, norm_var_time_rw = 0.0, label="RTC",
                  ts_quantization=True):
@@ -82,13 +90,12 @@ class Rtc():
                                                  self._model_update_period_ns)
         self._model_t_last_update    = 0
 
-        logger = logging.getLogger('Rtc')
-        logger.debug("Initialized the %s RTC" %(self.label))
-        logger.debug("%-16s\t %f ns" %("Increment value:", self.inc_val_ns))
-        logger.debug("%-16s\t %f ns" %("Initial phase:", self.phase_ns))
-        logger.debug("%-16s\t Freq: %f MHz\tPeriod %f ns" %(
-            "Driving clock", self.freq_hz/1e6, 1.0/self.freq_hz))
-        logger.debug("%-16s\t %s" %("Initial time:", self.time))
+        logger.debug("Initialized the %s RTC", self.label)
+        logger.debug("%-16s\t %f ns", "Increment value:", self.inc_val_ns)
+        logger.debug("%-16s\t %f ns", "Initial phase:", self.phase_ns)
+        logger.debug("%-16s\t Freq: %f MHz\tPeriod %f ns", "Driving clock",
+                     self.freq_hz/1e6, 1.0/self.freq_hz)
+        logger.debug("%-16s\t %s", "Initial time:", self.time)
 
     def _randomize_driving_clk(self, t_sim_ns):
         """Update the properties of the driving clock
@@ -119,9 +126,8 @@ class Rtc():
             # Save the update time
             self._model_t_last_update = t_sim_ns
 
-            logger = logging.getLogger('Rtc')
-            logger.debug("[%-6s] New driving freq: %f MHz" %(self.label,
-                                                             self.freq_hz/1e6))
+            logger.debug("[%-6s] New driving freq: %f MHz", self.label,
+                         self.freq_hz/1e6)
 
             return True
 
@@ -152,7 +158,7 @@ class Rtc():
 
         # Based on the current RTC driving clock period (which changes over
         # time), check how many times the RTC has incremented since last time
-        rtc_period_ns = (1.0/self.freq_hz) * 1e9
+        rtc_period_ns = 1e9 / self.freq_hz
 
         # The number of increments controls the time scale behavior. If it is
         # truncated to integer values, the time-scale will be quantized, as in
@@ -165,6 +171,12 @@ class Rtc():
         # Prevent negative number of increments
         assert(n_new_incs >= 0)
 
+        # Nothing to update if the RTC has not incremented since last time
+        # (e.g., with a quantized time scale and less than one driving clock
+        # period elapsed)
+        if (n_new_incs == 0):
+            return
+
         # Elapsed time according to the RTC since last update:
         elapsed_ns = n_new_incs * self.inc_val_ns
         # NOTE: the elapsed time depends on the increment value that is
@@ -176,10 +188,12 @@ class Rtc():
         self.time       += elapsed_ns    # RTC tim
         self.t_last_inc += (n_new_incs * rtc_period_ns)
 
-        logger = logging.getLogger('Rtc')
-        logger.debug("[%-6s] Simulation time: %f ns" %(self.label, t_sim_ns))
-        logger.debug("[%-6s] Advance RTC by %u ns" %(self.label, elapsed_ns))
-        logger.debug("[%-6s] New RTC time: %s" %(self.label, self.time))
+        # NOTE: this method runs twice per simulation step, so check the
+        # logging level once instead of on every debug call
+        if (logger.isEnabledFor(logging.DEBUG)):
+            logger.debug("[%-6s] Simulation time: %f ns", self.label, t_sim_ns)
+            logger.debug("[%-6s] Advance RTC by %u ns", self.label, elapsed_ns)
+            logger.debug("[%-6s] New RTC time: %s", self.label, self.time)
 
     def get_time(self):
         """Get current RTC time
@@ -8,6 +8,7 @@ Conventions:
 
 """
 import logging, heapq, random, time
+import numpy as np
 from pathlib import Path
 from ptp.rtc import *
 from ptp.messages import *
@@ -20,6 +21,9 @@ logger = logging.getLogger(__name__)
 
 
 class SimTime():
+    # Accessed in every iteration of the simulation loop
+    __slots__ = ('time', 't_step')
+
     def __init__(self, t_step):
         """Simulation Time
 
@@ -38,7 +42,7 @@ class SimTime():
     def advance(self, next_time):
         """Advance simulation time to a specified instant"""
         self.time = next_time
-        logger.debug("Advance simulation time to: %f ns" %(self.time*1e9))
+        logger.debug("Advance simulation time to: %f ns", self.time*1e9)
 
     def step(self):
         """Advance simulation time by the simulation step"""
@@ -49,7 +53,8 @@ class Simulation():
     def __init__(self, n_iter = 100, sim_t_step = 1e-9, sync_period = 1.0/16,
                  rtc_clk_freq = 125e6, rtc_resolution = 0, freq_tolerance = 60,
                  freq_rw = 1e-18, phase_rw = 1e-12, pdv_distr="Gamma",
-                 gamma_shape=None, gamma_scale=None, ts_quantization=True):
+                 gamma_shape=None, gamma_scale=None, ts_quantization=True,
+                 seed=None):
         """PTP Simulation class
 
         Args:
@@ -67,6 +72,9 @@ class Simulation():
             gamma_shape     : Shape parameter of the Gamma distribution
             gamma_scale     : Scale parameter of the Gamma distribution
             ts_quantization : Enables quantization of the time scale
+            seed            : Seed for the random number generators used in
+                              the simulation. When None, the simulation is
+                              not reproducible.
 
         """
 
@@ -81,6 +89,7 @@ class Simulation():
         self.gamma_shape          = gamma_shape
         self.gamma_scale          = gamma_scale
         self.ts_quantization      = ts_quantization
+        self.seed                 = seed
 
         # Simulation time
         self.sim_timer = SimTime(sim_t_step)
@@ -119,7 +128,8 @@ class Simulation():
             'slave_phase_rw'        : self.slave_phase_rw,
             'gamma_shape'           : self.gamma_shape,
             'gamma_scale'           : self.gamma_scale,
-            'ts_quantization'       : self.ts_quantization
+            'ts_quantization'       : self.ts_quantization,
+            'seed'                  : self.seed
         }
 
         # Dataset
@@ -169,13 +179,20 @@ class Simulation():
 
         """
 
+        # The RTCs and the Delay_Req scheduling draw from the random module,
+        # whereas each PTP message draws from its own generator, seeded with
+        # an independent child of the simulation seed.
+        if (self.seed is not None):
+            random.seed(self.seed)
+        sync_seed, dreq_seed = np.random.SeedSequence(self.seed).spawn(2)
+
         # Register the PTP message objects
         sync = PtpEvt("Sync", self.sync_period, pdv_distr=self.pdv_distr,
                       gamma_shape=self.gamma_shape,
-                      gamma_scale=self.gamma_scale)
+                      gamma_scale=self.gamma_scale, seed=sync_seed)
         dreq = PtpEvt("Delay_Req", pdv_distr=self.pdv_distr,
                       gamma_shape=self.gamma_shape,
-                      gamma_scale=self.gamma_scale)
+                      gamma_scale=self.gamma_scale, seed=dreq_seed)
 
         # RTCs
         #
@@ -201,6 +218,7 @@ class Simulation():
 
         # Start with a sync transmission
         sync.next_tx = 0
+        msg_due      = 0
 
         DelayReqResp.log_header()
 
@@ -211,13 +229,20 @@ class Simulation():
             master_rtc.update(sim_time, evts)
             slave_rtc.update(sim_time, evts)
 
-            # Try processing all events
-            sync_transmitted = sync.tx(sim_time, master_rtc.get_time(), evts)
-            dreq_transmitted = dreq.tx(sim_time, slave_rtc.get_time(), evts)
-            sync_received    = sync.rx(sim_time, slave_rtc.get_time(),
-                                       master_rtc.get_time())
-            dreq_received    = dreq.rx(sim_time, master_rtc.get_time(),
-                                       slave_rtc.get_time())
+            # Try processing all events. Most iterations are RTC wake-ups,
+            # so skip the messages until any of them is due.
+            if (sim_time >= msg_due):
+                sync_transmitted = sync.tx(sim_time, master_rtc.get_time(),
+                                           evts)
+                dreq_transmitted = dreq.tx(sim_time, slave_rtc.get_time(),
+                                           evts)
+                sync_received    = sync.rx(sim_time, slave_rtc.get_time(),
+                                           master_rtc.get_time())
+                dreq_received    = dreq.rx(sim_time, master_rtc.get_time(),
+                                           slave_rtc.get_time())
+            else:
+                sync_transmitted = dreq_transmitted = False
+                sync_received    = dreq_received    = False
 
             # Post-processing for each message
             if (sync_transmitted):
@@ -266,6 +291,9 @@ class Simulation():
                 # Message exchange count
                 i_iter += 1
 
+            # Next time in which any of the messages is due
+            msg_due = min(sync.next_evt_time(), dreq.next_evt_time())
+
             # Update simulation time
             if (len(evts) > 0):
                 next_evt = heapq.heappop(evts)
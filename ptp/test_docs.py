@@ -0,0 +1,50 @@
+import unittest
+from unittest import mock
+import tempfile
+from ptp.docs import *
+
+
+class TestDocs(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.docs    = Docs(cfg_path=self.tmp_dir.name)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_add_dataset_saves(self):
+        """Each dataset added outside of a bulk block saves the catalog"""
+        with mock.patch.object(self.docs, '_catalog_dataset'), \
+             mock.patch.object(self.docs, '_save') as save:
+            self.docs.add_dataset("a.json")
+            self.docs.add_dataset("b.json")
+        self.assertEqual(save.call_count, 2)
+
+    def test_bulk_single_save(self):
+        """Nested bulk blocks save the catalog only once on exit"""
+        with mock.patch.object(self.docs, '_catalog_dataset') as catalog, \
+             mock.patch.object(self.docs, '_save') as save:
+            with self.docs.bulk():
+                self.docs.add_dataset("a.json")
+                with self.docs.bulk():
+                    self.docs.add_dataset("b.json")
+                self.assertEqual(save.call_count, 0)
+                self.docs.add_datasets(["c.json", "d.json"])
+                self.assertEqual(save.call_count, 0)
+            self.assertEqual(save.call_count, 1)
+            self.assertEqual(catalog.call_count, 4)
+
+        self.assertFalse(self.docs._defer_save)
+
+    def test_bulk_exception(self):
+        """A bulk block interrupted by an exception does not save"""
+        with mock.patch.object(self.docs, '_save') as save:
+            with self.assertRaises(RuntimeError):
+                with self.docs.bulk():
+                    raise RuntimeError
+        save.assert_not_called()
+        self.assertFalse(self.docs._defer_save)
+
+
+if __name__ == '__main__':
+    unittest.main()
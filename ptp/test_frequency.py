@@ -2,6 +2,9 @@ import unittest
 import copy
 import numpy as np
 from ptp.frequency import *
+from ptp.frequency import _pi_loop, _opt_lookup, _opt_store, \
+    _OPT_RESULTS_LEN
+import ptp.cache
 
 
 immutable_data = [
@@ -13,8 +16,24 @@ immutable_data = [
 ]
 
 
+class MemCache(ptp.cache.Cache):
+    """Cache handler that keeps the saved configurations in memory"""
+    def __init__(self):
+        self.saved = {}
+
+    def load(self, identifier):
+        return None
+
+    def save(self, data, identifier):
+        self.saved[identifier] = data
+
+
 class TestFrequency(unittest.TestCase):
     def setUp(self):
+        # Start and end each test without memoized optimization results
+        ptp.frequency._opt_results.clear()
+        self.addCleanup(ptp.frequency._opt_results.clear)
+
         self.data = copy.deepcopy(immutable_data)
         for elem in self.data:
             assert(elem["t4"] > elem["t1"])
@@ -86,6 +105,20 @@ class TestFrequency(unittest.TestCase):
         expected_drift = [10*x for x in expected_y_est]
         self.assertListEqual(drift_est, expected_drift)
 
+    def test_toffset_drift_est_new_data(self):
+        """Test drift estimation after replacing the dataset"""
+        self._estimate_foffset(strategy="two-way", N=1)
+
+        # Replace the dataset by a shorter one with edited estimates
+        new_data = copy.deepcopy(self.data[1:])
+        for r in new_data:
+            r["y_est"] = 0.1
+        self.estimator.data = new_data
+        self.estimator.estimate_drift()
+
+        drift_est = [r["drift"] for r in new_data if "drift" in r]
+        self.assertListEqual(drift_est, [1.0, 1.0, 1.0])
+
     def test_drift_err_eval(self):
         """Test the drift estimation error evaluation"""
         self._estimate_foffset(strategy="two-way")
@@ -139,4 +172,228 @@ class TestFrequency(unittest.TestCase):
         self.assertAlmostEqual(drift_err, last_err)
         self.assertAlmostEqual(cum_drift_err, last_norm_cum_err)
 
+    def test_drift_err_eval_window(self):
+        """Test the drift error evaluation over a sliding window"""
+        self._estimate_foffset(strategy="two-way")
+        self._estimate_drift()
+
+        # With a window of one sample, the windowed cumulative drifts are equal
+        # to the instantaneous drifts
+        expected_drift = np.array([(2.5-1)/3, (1.5-2)/3])
+        true_drift     = np.array([-0.4, -1])
+        norm_drift_err = (expected_drift - true_drift) / np.abs(true_drift)
+
+        cum_drift_err = self.estimator._eval_drift_err("mse", "cumulative",
+                                                       N=1)
+        self.assertAlmostEqual(cum_drift_err, np.square(norm_drift_err).mean())
+
+        cum_drift_err = self.estimator._eval_drift_err("max-error",
+                                                       "cumulative", N=1)
+        self.assertAlmostEqual(cum_drift_err, np.amax(np.abs(norm_drift_err)))
+
+        # Restrict the evaluation to the last window
+        cum_drift_err = self.estimator._eval_drift_err("max-error",
+                                                       "cumulative",
+                                                       n_samples=1, N=1)
+        self.assertAlmostEqual(cum_drift_err, np.abs(norm_drift_err[-1]))
+
+    def test_drift_err_eval_short_window(self):
+        """Test the drift error evaluation with less drifts than the window"""
+        self._estimate_foffset(strategy="two-way")
+        self._estimate_drift()
+
+        # Window longer than the number of drift estimates (2) but shorter than
+        # the dataset (5). Like a "valid" convolution, each window sum covers
+        # all drift estimates.
+        N              = 4
+        expected_drift = np.array([(2.5-1)/3, (1.5-2)/3])
+        true_drift     = np.array([-0.4, -1])
+        h              = np.ones(N)
+        true_cum_drift = np.convolve(true_drift, h, mode="valid")
+        cum_drift_err  = np.convolve(expected_drift, h, mode="valid") - \
+                         true_cum_drift
+        norm_drift_err = cum_drift_err / np.abs(true_cum_drift)
+
+        for loss, expected in [("mse", np.square(norm_drift_err).mean()),
+                               ("max-error", np.amax(np.abs(norm_drift_err)))]:
+            err = self.estimator._eval_drift_err(loss, "cumulative", N=N)
+            self.assertAlmostEqual(err, expected)
+            err = self.estimator._score_window(3, "two-way", loss,
+                                               "cumulative", n_samples=0, N=N)
+            self.assertAlmostEqual(err, expected)
+
+        # Same for the PI loop evaluation with 3 drift estimates past settling
+        x_est      = np.array([r["x_est"] for r in self.data])
+        true_drift = np.diff(np.array([r["x"] for r in self.data]))[1:]
+        for loss in ["mse", "max-error"]:
+            errors = ptp.frequency._eval_loop_row(x_est, true_drift, 1.0,
+                                                  [0.1, 0.01], 2, loss,
+                                                  "cumulative", N=N)
+            self.assertTrue(np.all(np.isfinite(errors)))
+
+    def test_loop_settling(self):
+        """Test that PI loop estimates are only saved after settling"""
+        self.estimator = Estimator(self.data)
+        self.estimator.loop(damping=1.0, loopbw=0.1, settling=0.4)
+
+        # With 5 samples, the loop is assumed settled from index 2 onwards
+        assert(all([not ("drift" in r) for r in self.data[:2]]))
+        assert(all([not ("x_loop" in r) for r in self.data[:2]]))
+        assert(all([("drift" in r) for r in self.data[2:]]))
+        assert(all([("x_loop" in r) for r in self.data[2:]]))
+
+        # Re-running with a longer settling period clears the former estimates
+        self.estimator.loop(damping=1.0, loopbw=0.1, settling=0.6)
+        assert(not ("drift" in self.data[2]))
+        assert(not ("x_loop" in self.data[2]))
+        assert("drift" in self.data[3])
+
+    def test_loop_grid_eval(self):
+        """Test the parallel evaluation of the PI loop parameter grid"""
+        self.estimator = Estimator(self.data)
+        damping_vec    = [0.707, 1.0]
+        loopbw_vec     = [0.1, 0.01]
+
+        # Reference errors evaluated one configuration at a time
+        expected = np.empty((2, 2))
+        for i, damping in enumerate(damping_vec):
+            for j, loopbw in enumerate(loopbw_vec):
+                self.estimator.loop(damping, loopbw, settling=0.4)
+                expected[i, j] = self.estimator._eval_drift_err(
+                    "mse", "instantaneous")
+
+        for max_workers in [1, 2]:
+            errors = self.estimator._eval_loop_grid(
+                damping_vec, loopbw_vec, 0.4, "mse", "instantaneous",
+                max_workers=max_workers)
+            np.testing.assert_allclose(errors, expected)
+
+    def test_optimize_to_drift_saves_optimum(self):
+        """Test that only the optimal estimates are saved on the dataset"""
+        self.estimator = Estimator(self.data)
+        self.estimator.optimize_to_drift("two-way", max_window_span=0.6,
+                                         force=True)
+        N = int(self.estimator.delta)
+
+        # Reference estimates computed directly with the optimal window
+        ref_data = copy.deepcopy(immutable_data)
+        for r, s in zip(ref_data, self.data):
+            r["x_est"] = s["x_est"]
+        ref_estimator = Estimator(ref_data, delta=N)
+        ref_estimator.process("two-way")
+        ref_estimator.estimate_drift()
+
+        for key in ["y_est", "drift"]:
+            self.assertEqual([r.get(key) for r in self.data],
+                             [r.get(key) for r in ref_data])
+
+    def test_opt_memo_saves_cache(self):
+        """Test that a memoized optimization is still saved on a new cache"""
+        self.estimator = Estimator(self.data)
+        best_loop      = self.estimator.optimize_loop(max_workers=1)
+        self.estimator.optimize_to_drift("two-way", max_window_span=0.6)
+        N_opt          = self.estimator.delta
+
+        # The next calls hit the in-process memo of the optimal results
+        cache = MemCache()
+        self.assertEqual(self.estimator.optimize_loop(cache=cache),
+                         best_loop)
+        self.estimator.optimize_to_drift("two-way", max_window_span=0.6,
+                                         cache=cache)
+        self.assertEqual((cache.saved['loop']['damping'],
+                          cache.saved['loop']['loopbw']), best_loop)
+        self.assertEqual(cache.saved['drift_estimator']['N'], N_opt)
+
+    def test_opt_one_way_keys(self):
+        """Test one-way optimizers on datasets with m-to-s timestamps only"""
+        data = [{k: r[k] for k in ["t1", "t2", "x"]} for r in self.data]
+        self.estimator = Estimator(data)
+        self.estimator.set_truth(delta=1)
+        self.estimator.optimize_to_y("one-way", max_window_span=0.6,
+                                     force=True)
+        self.estimator.optimize_to_drift("one-way", max_window_span=0.6)
+        self.assertTrue(all(["t3" not in r and "x_est" not in r
+                             for r in data]))
+        self.assertTrue(any(["drift" in r for r in data]))
+
+    def test_opt_memo_bound(self):
+        """Test that the memo of optimal results evicts the least recent"""
+        keys = [("test", i) for i in range(_OPT_RESULTS_LEN + 1)]
+        for i, key in enumerate(keys[:-1]):
+            _opt_store(key, i)
+
+        # Using the first entry makes the second one the least recent
+        self.assertEqual(_opt_lookup(keys[0]), 0)
+        _opt_store(keys[-1], _OPT_RESULTS_LEN)
+
+        self.assertEqual(_opt_lookup(keys[0]), 0)
+        self.assertIsNone(_opt_lookup(keys[1]))
+        self.assertEqual(_opt_lookup(keys[-1]), _OPT_RESULTS_LEN)
+        self.assertEqual(len(ptp.frequency._opt_results), _OPT_RESULTS_LEN)
+
+    def test_window_score(self):
+        """Test the drift error scoring of candidate windows"""
+        self.estimator = Estimator(self.data)
+        for strategy in ["one-way", "one-way-reversed", "two-way"]:
+            for N in [1, 2, 3]:
+                for loss in ["mse", "max-error"]:
+                    for criterion in ["cumulative", "instantaneous"]:
+                        self.estimator.delta = N
+                        self.estimator.process(strategy)
+                        self.estimator.estimate_drift()
+                        expected = self.estimator._eval_drift_err(
+                            loss, criterion, n_samples=1)
+                        score = self.estimator._score_window(
+                            N, strategy, loss, criterion, n_samples=1)
+                        self.assertAlmostEqual(score, expected)
+
+    def test_pi_loop_filter(self):
+        """Test the IIR filter implementation of the PI loop recurrence"""
+        x_est  = np.array([r["x_est"] for r in self.data])
+        Kp, Ki = 0.3, 0.05
+
+        # Reference recurrence
+        drift  = list()
+        x_loop = list()
+        f_int  = 0
+        dds    = x_est[0]
+        for x in x_est:
+            err    = x - dds
+            f_int += Ki * err
+            f_err  = Kp * err + f_int
+            drift.append(f_err)
+            x_loop.append(dds)
+            dds   += f_err
+
+        drift_est, x_loop_est = _pi_loop(x_est, Kp, Ki)
+        np.testing.assert_allclose(drift_est, drift, atol=1e-12)
+        np.testing.assert_allclose(x_loop_est, x_loop, atol=1e-12)
+
+    def test_pi_loop_filter_long(self):
+        """Test the PI loop filter precision over a long, drifting trace"""
+        # 400 ppb freq. offset at 16 Hz plus noise, with a large initial offset
+        n      = 200000
+        rng    = np.random.default_rng(0)
+        x_est  = 1e6 + (400e-9 * np.arange(n) * 1e9 / 16) + \
+                 rng.normal(0, 20, n)
+        Kp, Ki = ptp.frequency._loop_constants(1.0, 1e-5)
+
+        # Reference recurrence
+        drift  = np.empty(n)
+        x_loop = np.empty(n)
+        f_int  = 0
+        dds    = x_est[0]
+        for i, x in enumerate(x_est.tolist()):
+            err       = x - dds
+            f_int    += Ki * err
+            f_err     = Kp * err + f_int
+            drift[i]  = f_err
+            x_loop[i] = dds
+            dds      += f_err
 
+        # The drift estimates must not present a bias that grows over time
+        drift_est, x_loop_est = _pi_loop(x_est, Kp, Ki)
+        drift_err = drift_est - drift
+        self.assertLess(np.abs(drift_err).max(), 1e-8)
+        self.assertLess(abs(drift_err[-(n // 10):].mean()), 1e-9)
+        np.testing.assert_allclose(x_loop_est, x_loop, rtol=0, atol=1e-4)
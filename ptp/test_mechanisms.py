@@ -0,0 +1,24 @@
+import unittest
+from ptp.mechanisms import *
+from ptp.timestamping import Timestamp
+
+
+class TestMechanisms(unittest.TestCase):
+
+    def test_process_batch(self):
+        """Batch processing matches the per-exchange processing"""
+        t1 = [0,  10, 20]
+        t2 = [18, 26, 38]
+        t3 = [32, 40, 50]
+        t4 = [48, 52, 62]
+
+        delay_est, toffset_est = DelayReqResp.process_batch(t1, t2, t3, t4)
+
+        for i in range(len(t1)):
+            dreqresp = DelayReqResp(i, Timestamp(0, t1[i]))
+            dreqresp.set_t2(i, Timestamp(0, t2[i]))
+            dreqresp.set_t3(i, Timestamp(0, t3[i]))
+            dreqresp.set_t4(i, Timestamp(0, t4[i]))
+            results = dreqresp.process()
+            self.assertAlmostEqual(delay_est[i], results["d_est"])
+            self.assertAlmostEqual(toffset_est[i], results["x_est"])
@@ -0,0 +1,81 @@
+import unittest
+import numpy as np
+from ptp.messages import *
+from ptp.timestamping import Timestamp
+
+
+class TestMessages(unittest.TestCase):
+
+    def test_mirrored_erlang_pdf(self):
+        """Erlang pmf of the mirrored delays matches the analytical pdf"""
+        k, mu = 5, 21400
+        sync  = PtpEvt("Sync", pdv_distr="mirrorGamma", gamma_shape=k,
+                       gamma_scale=mu)
+
+        # Erlang pdf including the normalization constant
+        x  = np.arange(0, 21000, 1.0)
+        fx = ((1/mu)**k / np.prod(np.arange(1, k))) * x**(k-1) * np.exp(-x/mu)
+        fx = fx / fx.sum()
+
+        np.testing.assert_allclose(sync._erlang_fx_ms, fx)
+        self.assertAlmostEqual(sync._erlang_fx_ms.sum(), 1.0)
+
+    def test_mirrored_erlang_rnd(self):
+        """Mirrored Erlang samples follow the pmf"""
+        for name, max_val in [("Sync", 21000), ("Delay_Req", 18000)]:
+            evt     = PtpEvt(name, pdv_distr="mirrorGamma", seed=0)
+            samples = np.array([evt._mirrored_erlang_rnd()
+                                for _ in range(20000)])
+            pmf     = evt._erlang_fx_ms if name == "Sync" else \
+                      evt._erlang_fx_sm
+            # Mean of the mirrored pmf
+            mean    = np.sum(np.arange(max_val) * np.flip(pmf))
+
+            self.assertTrue(np.all(samples >= 0))
+            self.assertTrue(np.all(samples < max_val))
+            self.assertLess(abs(samples.mean() - mean), 0.05 * mean)
+
+    def test_gamma_rnd(self):
+        """Gamma delays are drawn in batches with the configured mean"""
+        k, mu   = 5, 1000
+        sync    = PtpEvt("Sync", pdv_distr="Gamma", gamma_shape=k,
+                         gamma_scale=mu, seed=0)
+        samples = np.array([sync._gamma_rnd() for _ in range(10000)])
+        self.assertLess(abs(samples.mean() - k*mu), 0.05 * k * mu)
+
+    def test_tx_uncertainty_rnd(self):
+        """Tx period uncertainties are drawn in batches with 1.5 us std"""
+        sync    = PtpEvt("Sync", 1.0/16, seed=0)
+        samples = np.array([sync._tx_uncertainty_rnd()
+                            for _ in range(10000)])
+        self.assertLess(abs(samples.mean()), 0.05 * 1500)
+        self.assertLess(abs(samples.std() - 1500), 0.05 * 1500)
+
+    def test_seed(self):
+        """Messages with the same seed draw the same random delays"""
+        for pdv_distr in ["Gamma", "Gaussian", "mirrorGamma"]:
+            delays = list()
+            for _ in range(2):
+                sync = PtpEvt("Sync", 1.0/16, pdv_distr=pdv_distr, seed=42)
+                sync.seq_num = 0
+                sync._sched_rx(0)
+                sync._sched_next_tx(0)
+                delays.append((sync.next_rx, sync.next_tx))
+            self.assertEqual(delays[0], delays[1])
+
+    def test_next_evt_time(self):
+        """Next event time follows the Tx and Rx of the message"""
+        evts = list()
+        dreq = PtpEvt("Delay_Req", seed=0)
+        self.assertEqual(dreq.next_evt_time(), float("inf"))
+        self.assertFalse(dreq.tx(0, Timestamp(0, 0), evts))
+        self.assertFalse(dreq.rx(0, Timestamp(0, 0), Timestamp(0, 0)))
+
+        dreq.sched_tx(1.0, evts)
+        self.assertEqual(dreq.next_evt_time(), 1.0)
+
+        self.assertTrue(dreq.tx(1.0, Timestamp(1, 0), evts))
+        self.assertEqual(dreq.next_evt_time(), dreq.next_rx)
+
+        self.assertTrue(dreq.rx(dreq.next_rx, Timestamp(2, 0), Timestamp(2, 0)))
+        self.assertEqual(dreq.next_evt_time(), float("inf"))
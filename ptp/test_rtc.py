@@ -44,6 +44,24 @@ class TestRtc(unittest.TestCase):
         error          = abs(measured_delta - (n_deltas * delta_ns))
         self.assertLess(error, period_ns)
 
+    def test_sub_period_passage(self):
+        """Test interval shorter than the driving clock period"""
+        freq       = 125e6
+        resolution = 0
+        period_ns  = (1.0/freq) * 1e9
+        rtc        = Rtc(freq, resolution)
+        rtc.update(100e-9)
+        t_start    = rtc.get_time()
+        cnt_start  = rtc.inc_cnt
+
+        # Advance time by less than one period since the last increment
+        rtc.update(100e-9 + (0.1 * period_ns * 1e-9))
+        t_end      = rtc.get_time()
+
+        # Results
+        self.assertEqual(rtc.inc_cnt, cnt_start)
+        self.assertEqual(float(t_end - t_start), 0)
+
     def test_known_freq_offset(self):
         """Test time-keeping with known time-varying frequency offset"""
         freq       = 125e6
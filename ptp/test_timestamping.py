@@ -1,6 +1,18 @@
 import unittest
+import copyreg, pickle
 from ptp.timestamping import *
 
+
+class DictStateTimestamp():
+    """Pickles like a Timestamp object with a __dict__ (i.e., without
+    __slots__), as saved on datasets by former versions"""
+    def __init__(self, sec, ns):
+        self.state = {'sec' : sec, 'ns' : ns}
+
+    def __reduce_ex__(self, protocol):
+        return (copyreg._reconstructor, (Timestamp, object, None), self.state)
+
+
 class TestTimestamping(unittest.TestCase):
 
     def test_sum(self):
@@ -148,6 +160,24 @@ class TestTimestamping(unittest.TestCase):
         self.assertEqual(z.sec, 0)
         self.assertEqual(z.ns, 999999980)
 
+    def test_result_types(self):
+        """Sum and subtraction results hold Python int sec and float ns"""
+        x = Timestamp(1, 999999900)
+        for z in [x + 120, x + 120.5, x - 1e9, x + Timestamp(2, 300)]:
+            self.assertIs(type(z.sec), int)
+            self.assertIs(type(z.ns), float)
+
+    def test_pickle(self):
+        """Pickling round trip and loading of dict-state pickles"""
+        x = pickle.loads(pickle.dumps(Timestamp(1, 200.5)))
+        self.assertEqual(x.sec, 1)
+        self.assertEqual(x.ns, 200.5)
+
+        y = pickle.loads(pickle.dumps([DictStateTimestamp(3, 120.0)]))[0]
+        self.assertIsInstance(y, Timestamp)
+        self.assertEqual(y.sec, 3)
+        self.assertEqual(y.ns, 120.0)
+
     def test_float_cast(self):
         """Cast timestamp into float"""
         x = Timestamp(1, 200.2)
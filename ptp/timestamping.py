@@ -1,13 +1,16 @@
 """Timestamp definitions
 """
 import numpy as np
-import logging
+import logging, math
 
 
 logger = logging.getLogger(__name__)
 
 
 class Timestamp():
+    # Instantiated on every timestamp operation, so avoid the per-instance dict
+    __slots__ = ('sec', 'ns')
+
     def __init__(self, sec_0 = 0, ns_0 = 0):
         """Timestamp type
 
@@ -19,9 +22,33 @@ class Timestamp():
         ns_0  : Initial nanoseconds value
 
         """
+        # NOTE: the casts guarantee the types of both fields, so the
+        # arithmetic methods do not need to check them.
         self.sec = int(sec_0)
         self.ns  = float(ns_0)
 
+    def __getstate__(self):
+        """Return the state for pickling
+
+        Use the same dict state as Timestamp objects had before declaring
+        __slots__, so that datasets remain readable by either version.
+
+        """
+        return {'sec' : self.sec, 'ns' : self.ns}
+
+    def __setstate__(self, state):
+        """Restore the state from pickled (e.g., simulation dataset) data
+
+        Args:
+            state : Dict with the sec and ns values, or the (dict, slots dict)
+                    tuple pickled by default for classes with __slots__.
+
+        """
+        if (isinstance(state, tuple)):
+            state = {k : v for d in state if d for k, v in d.items()}
+        self.sec = state['sec']
+        self.ns  = state['ns']
+
     def __add__(self, timestamp):
         """Sum another timestamp into self value
 
@@ -34,19 +61,21 @@ class Timestamp():
 
         """
 
+        # NOTE: use the math module and the % operator on Python scalars
+        # rather than np.floor and np.mod, which are much slower on scalars and
+        # return NumPy types. Both follow the same floor semantics.
         if (isinstance(timestamp, Timestamp)):
-            sec  = self.sec + timestamp.sec
-            sec += np.floor((self.ns + timestamp.ns) / 1e9)
-            ns   = np.mod((self.ns + timestamp.ns), 1e9)
+            sec    = self.sec + timestamp.sec
+            sum_ns = self.ns + timestamp.ns
         elif (isinstance(timestamp, float) or isinstance(timestamp, int)):
-            sec  = self.sec
-            sec += np.floor((self.ns + timestamp)/1e9);
-            ns   = np.mod((self.ns + timestamp), 1e9)
+            sec    = self.sec
+            sum_ns = self.ns + timestamp
         else:
             raise ValueError("Timestamp sum expects timestamp/float/int")
 
-        assert(isinstance(self.sec, int))
-        assert(isinstance(self.ns, float))
+        sec += math.floor(sum_ns / 1e9)
+        ns   = sum_ns % 1e9
+
         assert(ns >= 0)
         assert(ns < 1e9)
         return Timestamp(sec, ns)
@@ -58,16 +87,17 @@ class Timestamp():
             timestamp : the other timestamp to subtract
         """
         if (isinstance(timestamp, Timestamp)):
-            sec  = self.sec - timestamp.sec
-            sec += np.floor((self.ns - timestamp.ns)/1e9);
-            ns   = np.mod((self.ns - timestamp.ns), 1e9)
+            sec     = self.sec - timestamp.sec
+            diff_ns = self.ns - timestamp.ns
         elif (isinstance(timestamp, float) or isinstance(timestamp, int)):
-            sec  = self.sec
-            sec += np.floor((self.ns - timestamp)/1e9);
-            ns   = np.mod((self.ns - timestamp), 1e9)
+            sec     = self.sec
+            diff_ns = self.ns - timestamp
         else:
             raise ValueError("Timestamp sum expects timestamp/float/int")
 
+        sec += math.floor(diff_ns / 1e9)
+        ns   = diff_ns % 1e9
+
         # Protect from the issue of subtracting small number.
         # See https://docs.python.org/3/library/math.html#math.fmod
         if (ns == 1e9):
@@ -75,8 +105,6 @@ class Timestamp():
             sec += 1
             ns   = 0
 
-        assert(isinstance(self.sec, int))
-        assert(isinstance(self.ns, float))
         assert(ns >= 0)
         assert(ns < 1e9)
         return Timestamp(sec, ns)
@@ -69,6 +69,10 @@ def main():
                            action='store_true',
                            help="Disables the quantization of the time scale"
                            )
+    sim_group.add_argument('--seed', default=None,
+                           type=int,
+                           help="Seed for the random number generators \
+                           (set for a reproducible simulation)")
     args = parser.parse_args()
 
     logging_level = 70 - (10 * args.verbose) if args.verbose > 0 else 0
@@ -86,7 +90,8 @@ def main():
         pdv_distr = args.pdv_distr,
         gamma_shape = args.gamma_shape,
         gamma_scale = args.gamma_scale,
-        ts_quantization = (not args.no_ts_quantization)
+        ts_quantization = (not args.no_ts_quantization),
+        seed = args.seed
     )
 
     if (args.file is not None):